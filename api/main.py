@@ -1,48 +1,1494 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 
 from fastapi.middleware.cors import CORSMiddleware
 
 from dotenv import load_dotenv
-from google.cloud import translate_v2
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit
+from starlette.routing import Match
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
 
 import asyncio
 import copy
-import tempfile
 import hashlib
-import requests
+import heapq
+import httpx
 import base64
 import json
+import logging
 import re
+import threading
 import os
+import random
+import time
+import zlib
+from email.utils import parsedate_to_datetime
+import uuid
+from contextvars import ContextVar
 from pydantic import BaseModel
+from cachetools import TTLCache
 load_dotenv()
-import redis
 import copy
 
-rd = redis.Redis(host=os.getenv("REDIS_HOST"), port=6379, db=0)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Fraction of upstream/translation payloads logged at DEBUG
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "2000"))
 
-def normalize_name(name: str) -> str:
-    return re.sub(r'[^a-z0-9]', '', name.strip().lower())
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger("lean_tech_api")
+logger.setLevel(LOG_LEVEL)
 
-def generate_cache_key(name: str) -> str:
-    normalized_name = normalize_name(name)
-    return hashlib.md5(normalized_name.encode('utf-8')).hexdigest()
+# Labels for metrics and logs: the matched route, and the section being worked on
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="background")
+current_section: ContextVar[str] = ContextVar("current_section", default="")
 
+STAGE_LATENCY = Histogram(
+    "lean_stage_seconds",
+    "Time spent per request stage",
+    ["endpoint", "section", "stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40),
+)
+CACHE_REQUESTS = Counter("lean_cache_requests_total", "Cache lookups by key family and result", ["endpoint", "family", "result"])
+CACHE_TIER_REQUESTS = Counter(
+    "lean_cache_tier_requests_total", "Lookups per cache tier (l1 in-process, then redis), key family and result",
+    ["tier", "family", "result"],
+)
+CACHE_STALE = Counter("lean_cache_stale_total", "Expired section entries served while refreshing", ["section"])
+UPSTREAM_ERRORS = Counter("lean_upstream_errors_total", "Failed upstream attempts", ["provider", "reason"])
+UPSTREAM_RETRIES = Counter("lean_upstream_retries_total", "Retried upstream attempts", ["provider"])
+UPSTREAM_INFLIGHT = Gauge("lean_upstream_inflight", "Upstream requests in flight", ["provider"], multiprocess_mode="livesum")
+UPSTREAM_TOKENS = Counter(
+    "lean_upstream_tokens_total", "Tokens billed by Perplexity",
+    ["endpoint", "section", "strategy", "kind"],
+)
+SUMMARY_SECTION_RESULTS = Counter(
+    "lean_summary_sections_total", "Sections of assembled summaries, by whether they came back filled, empty or failed",
+    ["strategy", "section", "result"],
+)
+COMBINED_SECTIONS = Counter(
+    "lean_combined_sections_total", "Sections in combined answers, by whether they validated or were re-requested alone",
+    ["section", "result"],
+)
 
-PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
-key_base64 = os.getenv("GOOGLE_API_BASE64")
+@contextmanager
+def timed(stage: str, section: str | None = None):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(current_endpoint.get(), current_section.get() if section is None else section, stage).observe(
+            time.perf_counter() - started
+        )
+
+@contextmanager
+def upstream_inflight(provider: str):
+    gauge = UPSTREAM_INFLIGHT.labels(provider)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+def log_payload(label: str, payload):
+    # Full payloads only at DEBUG, and only for a sample of calls
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < LOG_PAYLOAD_SAMPLE_RATE:
+        text = payload if isinstance(payload, str) else json.dumps(payload)
+        logger.debug(
+            "%s endpoint=%s section=%s payload=%s",
+            label, current_endpoint.get(), current_section.get(), text[:LOG_PAYLOAD_MAX_CHARS],
+        )
+
+def cache_family(key: str) -> str:
+    parts = key.split(":")
+    if len(parts) == 1:
+        return "summary"
+    if parts[0] == "section":
+        return f"section_{parts[1]}"
+    if parts[:2] == ["translation", "doc"]:
+        return "translation_doc"
+    return parts[0]
+
+def count_cache(key: str, hit: bool):
+    CACHE_REQUESTS.labels(current_endpoint.get(), cache_family(key), "hit" if hit else "miss").inc()
+
+tier_stats = {tier: {"hit": 0, "miss": 0} for tier in ("l1", "redis")}
+
+def count_tier(tier: str, key: str, hit: bool):
+    result = "hit" if hit else "miss"
+    tier_stats[tier][result] += 1
+    CACHE_TIER_REQUESTS.labels(tier, cache_family(key), result).inc()
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+
+redis_pool = None
+rd = None
+
+def get_redis():
+    # Built on first use so importing the app neither loads the client nor opens a pool
+    global redis_pool, rd
+    if rd is None:
+        import redis.asyncio as aioredis
+
+        # Blocking pool: callers wait for a free connection instead of opening unbounded extras
+        redis_pool = aioredis.BlockingConnectionPool(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=0,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        )
+        rd = aioredis.Redis(connection_pool=redis_pool)
+    return rd
+
+# Cache entries are a 1-byte format marker, the 8-byte version of their key family, a codec
+# byte (j = JSON, z = zlib-compressed JSON) and the payload
+CACHE_FORMAT = b"\x01"
+# Bump to invalidate every family at once; prompt and schema changes invalidate their own families
+CACHE_VERSION = os.getenv("CACHE_VERSION", "1")
+# Smaller payloads stay uncompressed; zlib barely helps them and costs CPU on every hit
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "512"))
+CACHE_COMPRESS_LEVEL = int(os.getenv("CACHE_COMPRESS_LEVEL", "6"))
+# Encoded entries above this are not cached at all
+CACHE_MAX_ENTRY_BYTES = int(os.getenv("CACHE_MAX_ENTRY_BYTES", 1024 * 1024))
+# "expiring" evicts the entries closest to expiry first, "largest" the biggest ones
+CACHE_EVICTION_POLICY = os.getenv("CACHE_EVICTION_POLICY", "expiring")
+CACHE_EVICTION_BATCH = int(os.getenv("CACHE_EVICTION_BATCH", "100"))
+# How often each budgeted family drops the accounting of entries Redis already expired
+CACHE_SWEEP_INTERVAL = float(os.getenv("CACHE_SWEEP_INTERVAL", "60"))
+CACHE_BYTES_KEY = "cache:bytes"
+
+def cache_budgets() -> dict[str, int]:
+    # CACHE_BUDGET_MB_<FAMILY>, e.g. CACHE_BUDGET_MB_SECTION_CASES=64; 0 turns a default off
+    budgets = {"summary": 256.0, "translation_doc": 256.0}
+    for name, value in os.environ.items():
+        if name.startswith("CACHE_BUDGET_MB_"):
+            budgets[name[len("CACHE_BUDGET_MB_"):].lower()] = float(value)
+    return {family: int(mb * 1024 * 1024) for family, mb in budgets.items() if mb > 0}
+
+CACHE_BUDGETS = cache_budgets()
+
+CACHE_WRITE_BYTES = Counter("lean_cache_write_bytes_total", "Bytes written to the cache, before and after encoding", ["family", "kind"])
+CACHE_VERSION_MISMATCH = Counter("lean_cache_version_mismatch_total", "Entries ignored because another version wrote them", ["family"])
+CACHE_EVICTIONS = Counter("lean_cache_evictions_total", "Entries evicted to keep a family within its budget", ["family"])
+CACHE_OVERSIZE = Counter("lean_cache_oversize_total", "Entries not cached for exceeding CACHE_MAX_ENTRY_BYTES", ["family"])
+
+# Sets the entry and tracks its size and expiry so the family can be held to its budget
+TRACKED_SET_SCRIPT = """
+local previous = tonumber(redis.call('zscore', KEYS[2], KEYS[1]) or '0')
+if tonumber(ARGV[2]) > 0 then
+    redis.call('set', KEYS[1], ARGV[1], 'EX', ARGV[2])
+else
+    redis.call('set', KEYS[1], ARGV[1])
+end
+redis.call('zadd', KEYS[2], ARGV[3], KEYS[1])
+redis.call('zadd', KEYS[3], ARGV[4], KEYS[1])
+return redis.call('hincrby', KEYS[4], ARGV[5], tonumber(ARGV[3]) - previous)
+"""
+
+# Unlinks the entries that never expire and do not carry the header this version writes: entries from
+# before entries had a TTL and a header, which no budget or volatile-* eviction would ever drop.
+# ARGV[1] = "1" only counts them; ARGV[n + 1] is the header expected for KEYS[n].
+LEGACY_ENTRY_SCRIPT = """
+local found = 0
+for index, key in ipairs(KEYS) do
+    if redis.call('type', key).ok == 'string' and redis.call('ttl', key) == -1
+            and redis.call('getrange', key, 0, 8) ~= ARGV[index + 1] then
+        found = found + 1
+        if ARGV[1] ~= '1' then
+            redis.call('unlink', key)
+        end
+    end
+end
+return found
+"""
+
+VERSION_MISMATCH = object()
+family_versions: dict[str, bytes] = {}
+cache_stats: dict[str, dict] = {}
+evicting: set[str] = set()
+last_swept: dict[str, float] = {}
+# Keys read with another version's entry, waiting for remove_stale_entries
+stale_entries: set[str] = set()
+stale_cleanup: asyncio.Task | None = None
+
+def family_version(family: str) -> bytes:
+    # Hash of whatever shaped the family's entries, so changing a prompt or schema makes old entries miss
+    version = family_versions.get(family)
+    if version is None:
+        placeholders = ("{name}", "{province}", "{municipality}")
+        if family == "summary":
+            parts = [SYSTEM_PROMPT, json.dumps(SUMMARY_FIELDS), *(build(*placeholders) for build in SECTION_PROMPTS.values())]
+        elif family == "section_trending":
+            parts = [SYSTEM_PROMPT, trending_prompt()]
+        elif family.startswith("section_") and family[len("section_"):] in SECTION_PROMPTS:
+            parts = [SYSTEM_PROMPT, SECTION_PROMPTS[family[len("section_"):]](*placeholders)]
+        elif family == "translation_doc":
+            parts = [json.dumps(TRANSLATABLE_FIELDS)]
+        else:
+            parts = []
+        digest = hashlib.md5("\x00".join([CACHE_VERSION, family, *parts]).encode("utf-8")).hexdigest()[:8]
+        version = family_versions[family] = digest.encode("ascii")
+    return version
+
+def family_stats(family: str) -> dict:
+    return cache_stats.setdefault(family, {"writes": 0, "raw_bytes": 0, "stored_bytes": 0, "oversize": 0, "version_mismatches": 0})
+
+def encode_entry(key: str, value) -> bytes:
+    family = cache_family(key)
+    raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(raw) >= CACHE_COMPRESS_MIN_BYTES:
+        body, codec = zlib.compress(raw, CACHE_COMPRESS_LEVEL), b"z"
+    else:
+        body, codec = raw, b"j"
+    data = CACHE_FORMAT + family_version(family) + codec + body
+    stats = family_stats(family)
+    stats["writes"] += 1
+    stats["raw_bytes"] += len(raw)
+    stats["stored_bytes"] += len(data)
+    CACHE_WRITE_BYTES.labels(family, "raw").inc(len(raw))
+    CACHE_WRITE_BYTES.labels(family, "stored").inc(len(data))
+    return data
+
+def decode_entry(key: str, data: bytes) -> tuple:
+    # The value and the size of its JSON, which approximates what it takes in memory once decoded
+    family = cache_family(key)
+    try:
+        if not data.startswith(CACHE_FORMAT):
+            # Plain JSON from before versioning; only per-string translations do not depend on a prompt
+            return (json.loads(data), len(data)) if family == "translation" else (VERSION_MISMATCH, 0)
+        if data[1:9] != family_version(family):
+            return VERSION_MISMATCH, 0
+        body = zlib.decompress(data[10:]) if data[9:10] == b"z" else data[10:]
+        return json.loads(body), len(body)
+    except (zlib.error, ValueError):
+        logger.warning("Undecodable cache entry %s", key)
+        return VERSION_MISMATCH, 0
+
+def decode_cached(key: str, data: bytes | None) -> tuple:
+    # Entries from another version read as misses and get overwritten by the recomputed value
+    if data is None:
+        return None, 0
+    value, size = decode_entry(key, data)
+    if value is VERSION_MISMATCH:
+        family = cache_family(key)
+        family_stats(family)["version_mismatches"] += 1
+        CACHE_VERSION_MISMATCH.labels(family).inc()
+        queue_stale_entry(key)
+        return None, 0
+    return value, size
+
+def queue_stale_entry(key: str):
+    # A legacy entry without a TTL stays forever if its key is never written again, so it is removed
+    # behind the read; entries another version wrote with a TTL are left to expire or be overwritten
+    global stale_cleanup
+    stale_entries.add(key)
+    if stale_cleanup is None or stale_cleanup.done():
+        stale_cleanup = asyncio.create_task(remove_stale_entries())
+        background_tasks.add(stale_cleanup)
+        stale_cleanup.add_done_callback(background_tasks.discard)
+
+async def remove_stale_entries():
+    while stale_entries:
+        keys = [stale_entries.pop() for _ in range(min(len(stale_entries), CACHE_EVICTION_BATCH))]
+        try:
+            await remove_legacy_entries(keys)
+        except Exception as e:
+            logger.warning("Removing legacy cache entries failed: %r", e)
+
+async def remove_legacy_entries(keys: list[str], dry_run: bool = False) -> int:
+    # Of these keys, unlinks (or with dry_run only counts) the cache entries from before headers and TTLs
+    if not keys:
+        return 0
+    headers = [CACHE_FORMAT + family_version(cache_family(key)) for key in keys]
+    return await get_redis().eval(LEGACY_ENTRY_SCRIPT, len(keys), *keys, "1" if dry_run else "0", *headers)
+
+async def sweep_legacy_entries(dry_run: bool = False) -> tuple[int, int]:
+    # One-off SCAN for legacy entries nobody reads any more, such as pre-versioning summaries, whole-document
+    # translations and the old top_10 key. Returns (keys scanned, legacy entries found).
+    scanned = found = 0
+    batch = []
+    async for key in get_redis().scan_iter(count=1000, _type="STRING"):
+        batch.append(key.decode("utf-8"))
+        if len(batch) >= CACHE_EVICTION_BATCH:
+            found += await remove_legacy_entries(batch, dry_run)
+            scanned, batch = scanned + len(batch), []
+    found += await remove_legacy_entries(batch, dry_run)
+    return scanned + len(batch), found
+
+def cache_sizes_key(family: str) -> str:
+    return f"cache:sizes:{family}"
+
+def cache_expiry_key(family: str) -> str:
+    return f"cache:expiry:{family}"
+
+L1_CACHE_MAX_MB = float(os.getenv("L1_CACHE_MAX_MB", "64"))
+# Upper bound on how stale an entry can be if an invalidation is lost
+L1_CACHE_TTL = float(os.getenv("L1_CACHE_TTL", "30"))
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
+class LocalCache:
+    # Per-worker tier of decoded values in front of Redis, bounded by the JSON size of its entries.
+    # Any worker writing a key announces it over pub/sub and every worker drops its copy. While the
+    # channel is not subscribed invalidations could be missed, so the tier is bypassed until it is.
+    # Values are shared between requests and must be treated as read-only.
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.entries = TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=lambda entry: entry[1]) if max_bytes > 0 else None
+        # Bumped on every invalidation, so a read that raced one does not fill the tier with the old value
+        self.generation = 0
+        self.listener: asyncio.Task | None = None
+        self.subscribed = False
+        self.stats = {"invalidations": 0, "subscriptions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.entries is not None
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        if not self.subscribed:
+            self.ensure_listening()
+            return None
+        entry = self.entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def put(self, key: str, value, size: int, generation: int):
+        if self.subscribed and generation == self.generation:
+            try:
+                self.entries[key] = (value, size)
+            except ValueError:
+                # Larger than the whole tier
+                pass
+
+    def clear(self):
+        self.generation += 1
+        if self.enabled:
+            self.entries.clear()
+
+    def invalidate(self, keys):
+        self.generation += 1
+        if self.enabled:
+            for key in keys:
+                if self.entries.pop(key, None) is not None:
+                    self.stats["invalidations"] += 1
+
+    def ensure_listening(self):
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self.listen())
+
+    async def listen(self):
+        while True:
+            pubsub = get_redis().pubsub()
+            try:
+                await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        # Writes made while we were not listening went unannounced
+                        self.clear()
+                        self.subscribed = True
+                        self.stats["subscriptions"] += 1
+                    elif message["type"] == "message":
+                        self.invalidate(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cache invalidation listener failed: %r", e)
+            finally:
+                self.subscribed = False
+                await pubsub.aclose()
+            await asyncio.sleep(1)
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "subscribed": self.subscribed,
+            "entries": len(self.entries) if self.enabled else 0,
+            "bytes": int(self.entries.currsize) if self.enabled else 0,
+            "max_bytes": int(self.entries.maxsize) if self.enabled else 0,
+            **self.stats,
+        }
+
+    async def close(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except (asyncio.CancelledError, Exception):
+                pass
+
+local_cache = LocalCache(int(L1_CACHE_MAX_MB * 1024 * 1024), L1_CACHE_TTL)
+
+async def cache_get(key: str):
+    value = local_cache.get(key)
+    if local_cache.enabled:
+        count_tier("l1", key, value is not None)
+    if value is None:
+        with timed("cache_get"):
+            generation = local_cache.generation
+            value, size = decode_cached(key, await get_redis().get(key))
+        count_tier("redis", key, value is not None)
+        if value is not None:
+            local_cache.put(key, value, size, generation)
+    count_cache(key, value is not None)
+    return value
+
+async def cache_mget(keys: list[str]) -> list:
+    # One round-trip for any number of keys that are not in the local tier; missing entries come back as None
+    if not keys:
+        return []
+    values = [local_cache.get(key) for key in keys]
+    if local_cache.enabled:
+        for key, value in zip(keys, values):
+            count_tier("l1", key, value is not None)
+    missing = [index for index, value in enumerate(values) if value is None]
+    if missing:
+        with timed("cache_get"):
+            generation = local_cache.generation
+            fetched = await get_redis().mget([keys[index] for index in missing])
+            for index, data in zip(missing, fetched):
+                key = keys[index]
+                value, size = decode_cached(key, data)
+                count_tier("redis", key, value is not None)
+                if value is not None:
+                    local_cache.put(key, value, size, generation)
+                values[index] = value
+    for key, value in zip(keys, values):
+        count_cache(key, value is not None)
+    return values
+
+def is_current(key: str, header: bytes | None) -> bool:
+    if not header:
+        return False
+    if not header.startswith(CACHE_FORMAT):
+        return cache_family(key) == "translation"
+    return header[1:9] == family_version(cache_family(key))
+
+async def cache_exists_many(keys: list[str]) -> list[bool]:
+    # Reads only each entry's header, so entries another version wrote count as absent
+    if not keys:
+        return []
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.getrange(key, 0, 8)
+        headers = await pipe.execute()
+    current = [is_current(key, header) for key, header in zip(keys, headers)]
+    for key, header, fresh in zip(keys, headers, current):
+        if header and not fresh:
+            queue_stale_entry(key)
+    return current
+
+async def cache_exists(key: str) -> bool:
+    return (await cache_exists_many([key]))[0]
+
+async def cache_set(key: str, value, ttl: int | None = None):
+    await cache_set_many({key: value}, ttl)
+
+async def cache_set_many(items: dict, ttl: int | None = None):
+    # Pipelined so a batch of writes costs one round-trip
+    if not items:
+        return
+    with timed("cache_set"):
+        encoded = {}
+        for key, value in items.items():
+            data = encode_entry(key, value)
+            if len(data) > CACHE_MAX_ENTRY_BYTES:
+                family = cache_family(key)
+                family_stats(family)["oversize"] += 1
+                CACHE_OVERSIZE.labels(family).inc()
+                logger.warning("Not caching %s: %d bytes is over CACHE_MAX_ENTRY_BYTES", key, len(data))
+                continue
+            encoded[key] = data
+        if not encoded:
+            return
+        expires_at = time.time() + ttl if ttl else "+inf"
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for key, data in encoded.items():
+                family = cache_family(key)
+                if family in CACHE_BUDGETS:
+                    pipe.eval(TRACKED_SET_SCRIPT, 4, key, cache_sizes_key(family), cache_expiry_key(family), CACHE_BYTES_KEY,
+                              data, ttl or 0, len(data), expires_at, family)
+                else:
+                    pipe.set(key, data, ex=ttl)
+            if local_cache.enabled:
+                pipe.publish(CACHE_INVALIDATION_CHANNEL, json.dumps(list(encoded)))
+            results = await pipe.execute()
+        local_cache.invalidate(encoded)
+    for key, result in zip(encoded, results):
+        # Tracked writes return the family's new byte total
+        family = cache_family(key)
+        if family in CACHE_BUDGETS:
+            maybe_evict(family, result)
+
+def maybe_evict(family: str, total: int):
+    # Trimming runs in the background so the write that crossed the budget does not wait for it
+    due = total > CACHE_BUDGETS[family] or time.monotonic() - last_swept.get(family, 0) > CACHE_SWEEP_INTERVAL
+    if due and family not in evicting:
+        evicting.add(family)
+        last_swept[family] = time.monotonic()
+        task = asyncio.create_task(evict_family(family))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+async def drop_entries(family: str, keys: list, sizes: list) -> int:
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.unlink(*keys)
+        pipe.zrem(cache_sizes_key(family), *keys)
+        pipe.zrem(cache_expiry_key(family), *keys)
+        pipe.hincrby(CACHE_BYTES_KEY, family, -int(sum(size or 0 for size in sizes)))
+        if local_cache.enabled:
+            pipe.publish(CACHE_INVALIDATION_CHANNEL, json.dumps([key.decode("utf-8") for key in keys]))
+        _, _, _, total, *_ = await pipe.execute()
+    local_cache.invalidate(key.decode("utf-8") for key in keys)
+    return total
+
+async def cache_delete(keys: list[str]):
+    # Entries of budgeted families also give their bytes back to the family
+    plain = []
+    for family in dict.fromkeys(cache_family(key) for key in keys):
+        family_keys = [key for key in keys if cache_family(key) == family]
+        if family in CACHE_BUDGETS:
+            sizes = await get_redis().zmscore(cache_sizes_key(family), family_keys)
+            await drop_entries(family, [key.encode("utf-8") for key in family_keys], sizes)
+        else:
+            plain.extend(family_keys)
+    if plain:
+        async with get_redis().pipeline(transaction=False) as pipe:
+            pipe.unlink(*plain)
+            if local_cache.enabled:
+                pipe.publish(CACHE_INVALIDATION_CHANNEL, json.dumps(plain))
+            await pipe.execute()
+        local_cache.invalidate(plain)
+
+async def evict_family(family: str):
+    sizes_key = cache_sizes_key(family)
+    try:
+        # Entries Redis already expired only need their accounting dropped
+        expired = await get_redis().zrangebyscore(cache_expiry_key(family), "-inf", time.time(), start=0, num=10 * CACHE_EVICTION_BATCH)
+        if expired:
+            total = await drop_entries(family, expired, await get_redis().zmscore(sizes_key, expired))
+        else:
+            total = int(await get_redis().hget(CACHE_BYTES_KEY, family) or 0)
+        # Down to 90% so the next few writes do not start another pass straight away
+        target = CACHE_BUDGETS[family] * 0.9
+        while total > target:
+            if CACHE_EVICTION_POLICY == "largest":
+                victims = await get_redis().zrevrange(sizes_key, 0, CACHE_EVICTION_BATCH - 1)
+            else:
+                victims = await get_redis().zrange(cache_expiry_key(family), 0, CACHE_EVICTION_BATCH - 1)
+            if not victims:
+                break
+            sizes = await get_redis().zmscore(sizes_key, victims)
+            # Only as many as it takes to get under the target
+            count, excess = 0, total - target
+            while count < len(victims) and excess > 0:
+                excess -= sizes[count] or 0
+                count += 1
+            total = await drop_entries(family, victims[:count], sizes[:count])
+            CACHE_EVICTIONS.labels(family).inc(count)
+    except Exception as e:
+        logger.warning("Evicting %s failed: %s", family, e)
+    finally:
+        evicting.discard(family)
+
+async def cache_memory() -> dict:
+    # This worker's write volume per family, plus Redis-wide usage of the budgeted families
+    families = {family: dict(stats) for family, stats in cache_stats.items()}
+    budgeted = list(CACHE_BUDGETS)
+    async with get_redis().pipeline(transaction=False) as pipe:
+        pipe.hmget(CACHE_BYTES_KEY, budgeted)
+        for family in budgeted:
+            pipe.zcard(cache_sizes_key(family))
+        used, *entries = await pipe.execute()
+    for family, used_bytes, count in zip(budgeted, used, entries):
+        families.setdefault(family, {}).update(
+            {"budget_bytes": CACHE_BUDGETS[family], "used_bytes": int(used_bytes or 0), "entries": count}
+        )
+    return {"policy": CACHE_EVICTION_POLICY, "families": families}
+
+SINGLEFLIGHT_LOCK_TTL = int(os.getenv("SINGLEFLIGHT_LOCK_TTL", "120"))
+SINGLEFLIGHT_WAIT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_WAIT_TIMEOUT", "90"))
+SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv("SINGLEFLIGHT_POLL_INTERVAL", "2"))
+SINGLEFLIGHT_CHANNEL = "singleflight:done"
+
+# Only delete the lock if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class SingleFlight:
+    # Coalesces concurrent computations of the same key. Callers in this worker share one
+    # task; other workers wait on a Redis lock and are woken over pub/sub when it is released.
+
+    def __init__(self):
+        self.inflight: dict[str, asyncio.Task] = {}
+        self.waiters: dict[str, set[asyncio.Future]] = {}
+        self.listener: asyncio.Task | None = None
+        self.subscribed = asyncio.Event()
+        self.stats = {
+            "leader": 0,
+            "coalesced_local": 0,
+            "coalesced_remote": 0,
+            "remote_timeout": 0,
+        }
+
+    async def do(self, key: str, compute, lookup):
+        # compute() produces and stores the value; lookup() reads it back from the cache
+        task = self.inflight.get(key)
+        if task is not None:
+            self.stats["coalesced_local"] += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.create_task(self.run(key, compute, lookup))
+        self.inflight[key] = task
+        task.add_done_callback(lambda done: self.inflight.pop(key) if self.inflight.get(key) is done else None)
+        return await asyncio.shield(task)
+
+    async def run(self, key: str, compute, lookup):
+        lock_key = f"singleflight:lock:{key}"
+        token = uuid.uuid4().hex
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SINGLEFLIGHT_WAIT_TIMEOUT
+        waited = False
+
+        while True:
+            if await get_redis().set(lock_key, token, nx=True, ex=SINGLEFLIGHT_LOCK_TTL):
+                self.stats["leader"] += 1
+                try:
+                    return await compute()
+                finally:
+                    await get_redis().eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                    await get_redis().publish(SINGLEFLIGHT_CHANNEL, key)
+
+            if not waited:
+                self.stats["coalesced_remote"] += 1
+                waited = True
+
+            result = await self.wait_remote(key, lock_key, lookup, deadline)
+            if result is not None:
+                return result
+            if loop.time() >= deadline:
+                # The other worker is taking too long; stop waiting and compute it here
+                self.stats["remote_timeout"] += 1
+                return await compute()
+            # Lock released without a result (the leader failed), so try to take over
+
+    async def wait_remote(self, key: str, lock_key: str, lookup, deadline: float):
+        loop = asyncio.get_running_loop()
+        while loop.time() < deadline:
+            # Register before checking so a release between the check and the wait is not missed
+            notified = await self.subscribe(key, min(SINGLEFLIGHT_POLL_INTERVAL, deadline - loop.time()))
+            try:
+                result = await lookup()
+                if result is not None or not await get_redis().exists(lock_key):
+                    return result
+                timeout = min(SINGLEFLIGHT_POLL_INTERVAL, deadline - loop.time())
+                await asyncio.wait_for(notified, timeout=max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self.unsubscribe(key, notified)
+        return await lookup()
+
+    async def subscribe(self, key: str, timeout: float) -> asyncio.Future:
+        if self.listener is None or self.listener.done():
+            self.subscribed.clear()
+            self.listener = asyncio.create_task(self.listen())
+        notified = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(key, set()).add(notified)
+        try:
+            await asyncio.wait_for(self.subscribed.wait(), timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            # Pub/sub is unavailable; the waiter still re-checks every SINGLEFLIGHT_POLL_INTERVAL
+            pass
+        return notified
+
+    def unsubscribe(self, key: str, notified: asyncio.Future):
+        waiters = self.waiters.get(key)
+        if waiters is not None:
+            waiters.discard(notified)
+            if not waiters:
+                del self.waiters[key]
+
+    async def listen(self):
+        # Ends on any failure; the next subscribe() starts a new listener
+        pubsub = None
+        try:
+            pubsub = get_redis().pubsub()
+            await pubsub.subscribe(SINGLEFLIGHT_CHANNEL)
+            self.subscribed.set()
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                key = message["data"].decode("utf-8")
+                for notified in self.waiters.get(key, ()):
+                    if not notified.done():
+                        notified.set_result(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Single-flight listener failed: %r", e)
+        finally:
+            self.subscribed.clear()
+            if pubsub is not None:
+                await pubsub.aclose()
+
+    async def close(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except (asyncio.CancelledError, Exception):
+                pass
+
+singleflight = SingleFlight()
+
+
+class TokenBucket:
+    # Async token bucket: acquire() waits until enough tokens have accumulated
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self.lock:
+            while True:
+                self.refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "20"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+class UpstreamError(Exception):
+    def __init__(self, provider: str, detail: str, status_code: int | None = None,
+                 retryable: bool = False, retry_after: float | None = None):
+        super().__init__(f"{provider}: {detail}")
+        self.provider = provider
+        self.detail = detail
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+    @property
+    def throttled(self) -> bool:
+        return self.status_code == 429
+
+class UpstreamUnavailable(UpstreamError):
+    # Raised without calling the provider while its circuit is open
+    pass
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class AdaptiveTokenBucket(TokenBucket):
+    # AIMD: halve the rate when the provider throttles us, add a small step back per success
+
+    def __init__(self, rate: float, capacity: float, min_rate: float, max_rate: float, increase: float):
+        super().__init__(rate, capacity)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.last_decrease = 0.0
+
+    def on_success(self):
+        self.refill()
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        # A burst of 429s from requests already in flight counts as one signal
+        now = time.monotonic()
+        if now - self.last_decrease < 1.0:
+            return
+        self.refill()
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.last_decrease = now
+
+class CircuitBreaker:
+    # Opens after consecutive failures, then lets a single probe through once the reset timeout passes
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.probing or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+class UpstreamGovernor:
+    # Shared gate for one provider: rate limit, retries with backoff, and a circuit breaker
+
+    def __init__(self, provider: str, rate: float, burst: float, min_rate: float, max_rate: float):
+        self.provider = provider
+        self.bucket = AdaptiveTokenBucket(rate, burst, min_rate, max_rate, increase=max_rate / 100)
+        self.breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0, "rejected": 0}
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying workers from synchronizing
+        return random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2 ** attempt))
+
+    async def call(self, send):
+        # send() makes one attempt and raises UpstreamError to describe a failure
+        for attempt in range(UPSTREAM_MAX_RETRIES + 1):
+            if not self.breaker.allow():
+                self.stats["rejected"] += 1
+                UPSTREAM_ERRORS.labels(self.provider, "circuit_open").inc()
+                raise UpstreamUnavailable(self.provider, "circuit open", 503, retry_after=self.breaker.retry_after())
+
+            await self.bucket.acquire()
+            self.stats["calls"] += 1
+            try:
+                result = await send()
+            except UpstreamError as e:
+                UPSTREAM_ERRORS.labels(self.provider, str(e.status_code or "transport")).inc()
+                if e.throttled:
+                    self.stats["throttled"] += 1
+                    self.bucket.on_throttle()
+                if not e.retryable:
+                    # The provider answered; the request itself was bad
+                    self.breaker.record_success()
+                    raise
+                self.stats["failures"] += 1
+                self.breaker.record_failure()
+
+                delay = e.retry_after if e.retry_after is not None else self.backoff(attempt)
+                if attempt == UPSTREAM_MAX_RETRIES or delay > UPSTREAM_BACKOFF_MAX:
+                    raise
+                self.stats["retries"] += 1
+                UPSTREAM_RETRIES.labels(self.provider).inc()
+                logger.info("Retrying %s in %.2fs after %s", self.provider, delay, e.detail)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled, or failed before reaching the provider (a configuration error). Neither says
+                # anything about its health, but a half-open circuit must not wait on this probe forever
+                self.breaker.probing = False
+                raise
+
+            self.bucket.on_success()
+            self.breaker.record_success()
+            return result
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "rate": round(self.bucket.rate, 3), "state": self.breaker.state}
+
+perplexity_governor = UpstreamGovernor(
+    "perplexity",
+    rate=float(os.getenv("PERPLEXITY_RATE", "2")),
+    burst=float(os.getenv("PERPLEXITY_BURST", "16")),
+    min_rate=float(os.getenv("PERPLEXITY_MIN_RATE", "0.2")),
+    max_rate=float(os.getenv("PERPLEXITY_MAX_RATE", "10")),
+)
+translate_governor = UpstreamGovernor(
+    "translate",
+    rate=float(os.getenv("TRANSLATE_RATE", "10")),
+    burst=float(os.getenv("TRANSLATE_BURST", "20")),
+    min_rate=float(os.getenv("TRANSLATE_MIN_RATE", "1")),
+    max_rate=float(os.getenv("TRANSLATE_MAX_RATE", "50")),
+)
+
+
+DAY = 24 * 60 * 60
+
+# How long each section stays fresh, in seconds. Override with CACHE_TTL_<SECTION>.
+SECTION_TTLS = {
+    "names": 30 * DAY,
+    "desc": 7 * DAY,
+    "career": 7 * DAY,
+    "dynasty": 7 * DAY,
+    "bills": 3 * DAY,
+    "education": 30 * DAY,
+    "projects": 3 * DAY,
+    "cases": DAY,
+    "trending": DAY,
+}
+for section in SECTION_TTLS:
+    SECTION_TTLS[section] = int(os.getenv(f"CACHE_TTL_{section.upper()}", SECTION_TTLS[section]))
+
+# Expired sections are still served for this long while a background refresh runs
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", 7 * DAY))
+SUMMARY_TTL = int(os.getenv("CACHE_TTL_SUMMARY", DAY))
+# A summary assembled from stale sections is only kept until the refreshes land
+STALE_SUMMARY_TTL = int(os.getenv("CACHE_TTL_STALE_SUMMARY", 60))
+# A section whose answer was cut off is kept this long, and only served until a refetch replaces it
+PARTIAL_SECTION_TTL = int(os.getenv("CACHE_TTL_PARTIAL_SECTION", 60))
+
+# Set by compute_summary to learn which sections were served stale
+stale_sections: ContextVar[set | None] = ContextVar("stale_sections", default=None)
+background_tasks: set[asyncio.Task] = set()
+
+def section_entry(section: str, response: dict, now: float) -> tuple[dict, int]:
+    # The cache entry for a section response and its Redis TTL
+    if response.get("partial"):
+        # Cut off mid-answer: good enough to serve for now, but stale from the start so the next read refetches it
+        return {"response": response, "fresh_until": now}, PARTIAL_SECTION_TTL
+    ttl = SECTION_TTLS[section]
+    return {"response": response, "fresh_until": now + ttl}, ttl + CACHE_STALE_TTL
+
+async def refresh_section(section: str, key: str, prompt: str) -> dict:
+    current_section.set(section)
+    response = await get_response(prompt)
+    entry, ttl = section_entry(section, response, time.time())
+    await cache_set(key, entry, ttl=ttl)
+    return entry
+
+async def refresh_section_in_background(section: str, key: str, prompt: str):
+    # The stream that triggered this refresh was already answered from the stale entry
+    item_listener.set(None)
+    try:
+        await singleflight.do(key, lambda: refresh_section(section, key, prompt), lambda: cache_get(key))
+    except Exception as e:
+        logger.warning("Background refresh of %s failed: %r", key, e)
+
+async def cached_section(section: str, name: str, province: str, municipality: str, prompt: str) -> dict:
+    key = generate_section_key(section, name, province, municipality)
+    entry = await cache_get(key)
+
+    if entry is None:
+        entry = await singleflight.do(key, lambda: refresh_section(section, key, prompt), lambda: cache_get(key))
+    elif entry["fresh_until"] <= time.time():
+        # Stale-while-revalidate: answer now, refresh behind the response
+        CACHE_STALE.labels(section).inc()
+        task = asyncio.create_task(refresh_section_in_background(section, key, prompt))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+        stale = stale_sections.get()
+        if stale is not None:
+            stale.add(section)
+
+    return entry["response"]
 
-key_json = base64.b64decode(key_base64)
+def normalize_name(name: str) -> str:
+    return re.sub(r'[^a-z0-9]', '', name.strip().lower())
 
+def name_spelling(name: str) -> str:
+    # normalize_name with the word breaks kept, so fuzzy matching can compare word by word
+    return " ".join(re.findall(r'[a-z0-9]+', name.strip().lower()))
+
+def generate_cache_key(name: str, province: str = "", municipality: str = "") -> str:
+    # Namesakes in different towns get their own summary; without a locality the key is the old name-only one
+    parts = [normalize_name(part or "") for part in (name, province, municipality)]
+    key_source = "|".join(parts) if province or municipality else parts[0]
+    return hashlib.md5(key_source.encode('utf-8')).hexdigest()
+
+def generate_section_key(section: str, name: str, province: str = "", municipality: str = "") -> str:
+    # Sections are looked up with the locality in the prompt, so it is part of the key. Callers pass the
+    # canonical name from entity_index.resolve, so every spelling of a politician shares each section
+    parts = [normalize_name(part or "") for part in (name, province, municipality)]
+    return f"section:{section}:" + hashlib.md5("|".join(parts).encode('utf-8')).hexdigest()
+
+ENTITY_ALIASES_KEY = "entity:aliases"
+ENTITY_CANONICAL_KEY = "entity:canonical"
+# Stream of changes to the two hashes above, which workers follow instead of reloading them
+ENTITY_LOG_KEY = "entity:log"
+# Learned aliases and entities by when they were last learned
+ENTITY_LEARNED_KEY = "entity:learned"
+# Most learned aliases and entities kept in Redis; the least recently learned are dropped first
+ENTITY_MAX_LEARNED = int(os.getenv("ENTITY_MAX_LEARNED", "50000"))
+# Changes kept in the log; a worker that falls further behind reloads the whole index
+ENTITY_LOG_MAX = int(os.getenv("ENTITY_LOG_MAX", "10000"))
+ENTITY_LOG_BATCH = 500
+ENTITY_SEEDS_PATH = os.getenv("ENTITY_SEEDS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "aliases.json"))
+# Seconds between catching up on the aliases other workers have learned
+ENTITY_REFRESH_INTERVAL = float(os.getenv("ENTITY_REFRESH_INTERVAL", "60"))
+# Most typos a misspelt name may have to resolve to a known alias, at most one per word. Relatives
+# often differ by a letter or two (Juan and Juana, Mario and Maria), so the given name must match exactly
+ENTITY_FUZZY_MAX_EDITS = int(os.getenv("ENTITY_FUZZY_MAX_EDITS", "2"))
+ENTITY_FUZZY_MIN_LENGTH = 6
+# Shorter words (Jr, Sr, III, Dy, Go) must match exactly
+ENTITY_FUZZY_MIN_WORD = 4
+ENTITY_FUZZY_CANDIDATES = 10
+# Scope of the curated seeds, which apply whatever locality is asked for
+SEED_SCOPE = "*"
+
+def locality_scope(province: str = "", municipality: str = "") -> str:
+    return f"{normalize_name(province or '')}|{normalize_name(municipality or '')}"
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+def name_suffix(alias: str) -> str:
+    # Generational suffix or number; "Ferdinand Marcos" and "Ferdinand Marcos Jr." are one typo apart
+    match = re.search(r"(jr|sr|iii|ii|iv|\d+)$", alias)
+    return match.group(1) if match else ""
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    # Edits between a and b, swapping two neighbouring letters counting as one typo; limit + 1 as
+    # soon as it is known to be over the limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            edits = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            if before is not None and j > 1 and char == b[j - 2] and a[i - 2] == other:
+                edits = min(edits, before[j - 2] + 1)
+            current.append(edits)
+        if min(current) > limit and min(previous) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+def spelling_typos(words: list[str], candidate: list[str]) -> int | None:
+    # Edits between two spellings compared word by word, or None if they name different people:
+    # another given name (Rigo and Rodrigo, Imee and Imelda), another number of words, a short
+    # word such as a suffix that differs, or more than one typo in a word
+    if len(words) != len(candidate) or words[0] != candidate[0]:
+        return None
+    total = 0
+    for word, other in zip(words[1:], candidate[1:]):
+        limit = 1 if min(len(word), len(other)) >= ENTITY_FUZZY_MIN_WORD else 0
+        edits = edit_distance(word, other, limit)
+        if edits > limit:
+            return None
+        total += edits
+    return total if total <= ENTITY_FUZZY_MAX_EDITS else None
+
+def first_string(value) -> str:
+    if isinstance(value, list):
+        value = next((item for item in value if isinstance(item, str) and item.strip()), "")
+    return value.strip() if isinstance(value, str) else ""
+
+class EntityIndex:
+    # Maps every known spelling of a politician to one canonical (name, province, municipality), so
+    # "BBM", "Bongbong Marcos" and "Ferdinand Marcos Jr." share one summary. Curated seeds apply in
+    # any locality; aliases learned from /retrieve/names only in the locality they were asked in,
+    # so a namesake elsewhere is not merged. Learned aliases are shared between workers in Redis,
+    # capped at ENTITY_MAX_LEARNED, and every change is appended to a log that workers catch up on.
+
+    def __init__(self):
+        # (scope, normalized name) -> entity id
+        self.aliases: dict[tuple[str, str], str] = {}
+        self.entities: dict[str, tuple[str, str, str]] = {}
+        # Trigram -> (scope, spelling) of the aliases containing it, spelling as given by name_spelling
+        self.grams: dict[str, set[tuple[str, str]]] = {}
+        self.seed_entities: set[str] = set()
+        self.loaded_at: float | None = None
+        # Last entry of ENTITY_LOG_KEY applied here; None until the first full load
+        self.log_id: str | None = None
+        self.lock = asyncio.Lock()
+        self.stats = {"exact": 0, "fuzzy": 0, "unresolved": 0, "learned": 0, "trimmed": 0, "full_loads": 0}
+
+    def add(self, scope: str, spelling: str, entity_id: str) -> bool:
+        # Aliases stored before spellings kept their word breaks are a single word, so they only resolve exactly
+        alias = spelling.replace(" ", "")
+        key = (scope, alias)
+        if not alias or self.aliases.get(key) == entity_id:
+            return False
+        self.aliases[key] = entity_id
+        for gram in trigrams(alias):
+            self.grams.setdefault(gram, set()).add((scope, spelling))
+        return True
+
+    def remove(self, scope: str, spelling: str):
+        alias = spelling.replace(" ", "")
+        if self.aliases.pop((scope, alias), None) is None:
+            return
+        for gram in trigrams(alias):
+            keys = self.grams.get(gram)
+            if keys is not None:
+                keys.discard((scope, spelling))
+                if not keys:
+                    del self.grams[gram]
+
+    def add_entity(self, entity_id: str, canonical: tuple[str, str, str]):
+        # The canonical spelling is not stored as an alias, but fuzzy matching still needs it indexed
+        self.entities[entity_id] = canonical
+        self.add(locality_scope(canonical[1], canonical[2]), name_spelling(canonical[0]), entity_id)
+
+    def load_seeds(self):
+        try:
+            with open(ENTITY_SEEDS_PATH) as seeds_file:
+                seeds = json.load(seeds_file)
+        except FileNotFoundError:
+            return
+        for seed in seeds:
+            canonical = (seed["name"], seed.get("province", ""), seed.get("municipality", ""))
+            entity_id = generate_cache_key(*canonical)
+            self.entities[entity_id] = canonical
+            self.seed_entities.add(entity_id)
+            for alias in (seed["name"], *seed.get("aliases", [])):
+                self.add(SEED_SCOPE, name_spelling(alias), entity_id)
+
+    def apply(self, aliases: dict, entities: dict, removed: list):
+        for entity_id, canonical in entities.items():
+            self.add_entity(entity_id, tuple(canonical))
+        for field, entity_id in aliases.items():
+            scope, _, alias = field.partition(":")
+            self.add(scope, alias, entity_id)
+        for member in removed:
+            kind, _, value = member.partition(":")
+            if kind == "alias":
+                scope, _, alias = value.partition(":")
+                self.remove(scope, alias)
+            elif kind == "entity" and value not in self.seed_entities:
+                canonical = self.entities.pop(value, None)
+                if canonical is not None:
+                    self.remove(locality_scope(canonical[1], canonical[2]), name_spelling(canonical[0]))
+
+    async def load_all(self):
+        # Rebuilt from scratch, so entries trimmed while this worker was not following the log do not linger
+        rd = get_redis()
+        last = await rd.xrevrange(ENTITY_LOG_KEY, count=1)
+        log_id = last[0][0].decode("utf-8") if last else "0-0"
+        entities = {entity_id.decode("utf-8"): json.loads(canonical) async for entity_id, canonical in rd.hscan_iter(ENTITY_CANONICAL_KEY)}
+        aliases = {field.decode("utf-8"): entity_id.decode("utf-8") async for field, entity_id in rd.hscan_iter(ENTITY_ALIASES_KEY)}
+        # Entries stored before learning was tracked are made the first to be trimmed
+        untracked = {f"alias:{field}": 0 for field in aliases} | {f"entity:{entity_id}": 0 for entity_id in entities}
+        if untracked:
+            await rd.zadd(ENTITY_LEARNED_KEY, untracked, nx=True)
+        self.aliases, self.entities, self.grams = {}, {}, {}
+        self.load_seeds()
+        self.apply(aliases, entities, [])
+        # Changes logged during the scan are applied again on the next refresh, which is harmless
+        self.log_id = log_id
+        self.stats["full_loads"] += 1
+
+    async def catch_up(self) -> bool:
+        # Applies what other workers logged since the last refresh; False if some of it was already trimmed
+        rd = get_redis()
+        if self.log_id == "0-0":
+            # The log was empty at the last full load
+            if await rd.xlen(ENTITY_LOG_KEY) >= ENTITY_LOG_MAX:
+                return False
+            entries = await rd.xrange(ENTITY_LOG_KEY, count=ENTITY_LOG_BATCH)
+        else:
+            # Read from the last applied entry: if it is gone, entries after it may be too
+            entries = await rd.xrange(ENTITY_LOG_KEY, min=self.log_id, count=ENTITY_LOG_BATCH + 1)
+            if not entries or entries[0][0].decode("utf-8") != self.log_id:
+                return False
+            entries = entries[1:]
+        while entries:
+            for entry_id, fields in entries:
+                self.apply(
+                    json.loads(fields.get(b"aliases", b"{}")),
+                    json.loads(fields.get(b"entities", b"{}")),
+                    json.loads(fields.get(b"removed", b"[]")),
+                )
+                self.log_id = entry_id.decode("utf-8")
+            entries = (await rd.xrange(ENTITY_LOG_KEY, min=self.log_id, count=ENTITY_LOG_BATCH + 1))[1:]
+        return True
+
+    async def refresh(self):
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < ENTITY_REFRESH_INTERVAL:
+            return
+        async with self.lock:
+            if self.loaded_at is not None and time.monotonic() - self.loaded_at < ENTITY_REFRESH_INTERVAL:
+                return
+            try:
+                if self.log_id is None or not await self.catch_up():
+                    await self.load_all()
+            except Exception as e:
+                # Lookups fall back to the name as given until the next refresh
+                logger.warning("Could not load the entity index: %r", e)
+                if not self.seed_entities:
+                    self.load_seeds()
+            self.loaded_at = time.monotonic()
+
+    def lookup(self, alias: str, scope: str) -> str | None:
+        return self.aliases.get((scope, alias)) or self.aliases.get((SEED_SCOPE, alias))
+
+    def fuzzy(self, spelling: str, scope: str) -> str | None:
+        # Trigram overlap picks a few candidates, word-by-word edit distance decides between them
+        alias = spelling.replace(" ", "")
+        if len(alias) < ENTITY_FUZZY_MIN_LENGTH:
+            return None
+        shared = {}
+        for gram in trigrams(alias):
+            for key in self.grams.get(gram, ()):
+                if key[0] in (scope, SEED_SCOPE):
+                    shared[key] = shared.get(key, 0) + 1
+        words = spelling.split()
+        best, best_typos = set(), ENTITY_FUZZY_MAX_EDITS + 1
+        for key in heapq.nlargest(ENTITY_FUZZY_CANDIDATES, shared, key=shared.get):
+            entity_id = self.aliases.get((key[0], key[1].replace(" ", "")))
+            if entity_id is None or name_suffix(key[1].replace(" ", "")) != name_suffix(alias):
+                continue
+            typos = spelling_typos(words, key[1].split())
+            if typos is None or typos > best_typos:
+                continue
+            if typos < best_typos:
+                best, best_typos = set(), typos
+            best.add(entity_id)
+        # Equally close to two people is no match at all
+        return best.pop() if len(best) == 1 else None
+
+    async def resolve(self, name: str, province: str = "", municipality: str = "", fuzzy: bool = True) -> tuple[str, str, str]:
+        # fuzzy=False for names nobody typed, which are not misspelt and are worse merged with a relative
+        await self.refresh()
+        spelling, scope = name_spelling(name), locality_scope(province, municipality)
+        entity_id = self.lookup(spelling.replace(" ", ""), scope)
+        if entity_id is not None:
+            self.stats["exact"] += 1
+        else:
+            entity_id = self.fuzzy(spelling, scope) if fuzzy else None
+            self.stats["fuzzy" if entity_id else "unresolved"] += 1
+        return self.entities.get(entity_id, (name, province, municipality))
+
+    async def learn(self, name: str, province: str, municipality: str, names):
+        # The spelling asked for, the common name and the legal name all become aliases of one entity
+        if not isinstance(names, dict):
+            return
+        common, legal = first_string(names.get("commonName")), first_string(names.get("legalName"))
+        if not common and not legal:
+            return
+        scope = locality_scope(province, municipality)
+        spellings = [name_spelling(alias) for alias in (name, common, legal) if alias]
+
+        entity_id = next(filter(None, (self.lookup(spelling.replace(" ", ""), scope) for spelling in spellings[1:])), None)
+        if entity_id not in self.entities:
+            # New, or its record was trimmed
+            canonical = (common or legal, province or "", municipality or "")
+            entity_id = generate_cache_key(*canonical)
+            self.add_entity(entity_id, canonical)
+        canonical = self.entities[entity_id]
+        # Only spellings that would not already resolve here are worth keeping: not the canonical
+        # name, which maps to the canonical cache key unaided, nor curated or earlier aliases
+        own = normalize_name(canonical[0]) if locality_scope(canonical[1], canonical[2]) == scope else None
+        added = {
+            f"{scope}:{spelling}": entity_id
+            for spelling in dict.fromkeys(spellings)
+            if spelling.replace(" ", "") != own and self.lookup(spelling.replace(" ", ""), scope) != entity_id
+            and self.add(scope, spelling, entity_id)
+        }
+        if not added:
+            return
+
+        self.stats["learned"] += len(added)
+        learned_at = time.time()
+        entities = {} if entity_id in self.seed_entities else {entity_id: canonical}
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                if entities:
+                    pipe.hset(ENTITY_CANONICAL_KEY, entity_id, json.dumps(canonical))
+                pipe.hset(ENTITY_ALIASES_KEY, mapping=added)
+                # Scored by when they were last learned, so the trim drops the least recently seen
+                pipe.zadd(ENTITY_LEARNED_KEY, {
+                    **{f"alias:{field}": learned_at for field in added},
+                    **{f"entity:{learned}": learned_at for learned in entities},
+                })
+                pipe.xadd(ENTITY_LOG_KEY, {"aliases": json.dumps(added), "entities": json.dumps(entities)},
+                          maxlen=ENTITY_LOG_MAX, approximate=True)
+                pipe.zcard(ENTITY_LEARNED_KEY)
+                *_, learned = await pipe.execute()
+            if learned > ENTITY_MAX_LEARNED:
+                await self.trim(learned - ENTITY_MAX_LEARNED)
+        except Exception as e:
+            logger.warning("Could not store aliases for %s: %r", name, e)
+
+    async def trim(self, count: int):
+        # Forgets the least recently learned aliases and entities in Redis and, through the log, in every worker
+        popped = await get_redis().zpopmin(ENTITY_LEARNED_KEY, count)
+        members = [member.decode("utf-8") for member, _ in popped]
+        aliases = [member[len("alias:"):] for member in members if member.startswith("alias:")]
+        entities = [member[len("entity:"):] for member in members if member.startswith("entity:")]
+        if not members:
+            return
+        async with get_redis().pipeline(transaction=False) as pipe:
+            if aliases:
+                pipe.hdel(ENTITY_ALIASES_KEY, *aliases)
+            if entities:
+                pipe.hdel(ENTITY_CANONICAL_KEY, *entities)
+            pipe.xadd(ENTITY_LOG_KEY, {"removed": json.dumps(members)}, maxlen=ENTITY_LOG_MAX, approximate=True)
+            await pipe.execute()
+        self.apply({}, {}, members)
+        self.stats["trimmed"] += len(members)
+
+entity_index = EntityIndex()
 
-with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-    tmp_file.write(key_json)
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = tmp_file.name
 
-translate_client = translate_v2.Client()
+PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
+GOOGLE_API_BASE64 = os.getenv("GOOGLE_API_BASE64")
+
+translate_client = None
+translate_client_lock = threading.Lock()
+
+def get_translate_client():
+    # google.cloud is slow to import and most requests never translate, so the client is built
+    # on the first translation, from the in-memory service account rather than a credentials file
+    global translate_client
+    with translate_client_lock:
+        if translate_client is None:
+            from google.cloud import translate_v2
+
+            credentials = None
+            if GOOGLE_API_BASE64:
+                from google.oauth2 import service_account
+
+                info = json.loads(base64.b64decode(GOOGLE_API_BASE64))
+                credentials = service_account.Credentials.from_service_account_info(info)
+            translate_client = translate_v2.Client(credentials=credentials)
+    return translate_client
+
+def translate_sync(batch: list[str], target_language: str) -> list[dict]:
+    return get_translate_client().translate(batch, target_language=target_language)
+
+PERPLEXITY_URL = os.getenv("PERPLEXITY_URL", "https://api.perplexity.ai/chat/completions")
+
+# Shared upstream HTTP client settings
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_PER_HOST_CONCURRENCY = int(os.getenv("HTTP_PER_HOST_CONCURRENCY", "16"))
+
+http_client: httpx.AsyncClient | None = None
+host_limits: dict[str, asyncio.Semaphore] = {}
+
+def build_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
 
-app = FastAPI()
+def get_http_client() -> httpx.AsyncClient:
+    # Normally opened by the lifespan handler, but built on demand for runtimes that skip it
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = build_http_client()
+    return http_client
+
+def host_semaphore(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc
+    if host not in host_limits:
+        host_limits[host] = asyncio.Semaphore(HTTP_PER_HOST_CONCURRENCY)
+    return host_limits[host]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_http_client()
+    start_prewarm()
+    yield
+    await stop_prewarm()
+    if http_client is not None:
+        await http_client.aclose()
+    await singleflight.close()
+    await local_cache.close()
+    await stop_batch_workers()
+    if rd is not None:
+        await rd.aclose()
+    if redis_pool is not None:
+        await redis_pool.disconnect()
+
+app = FastAPI(lifespan=lifespan)
+
+class MetricsLabelMiddleware:
+    # Labels everything a request does with its route template, and times the whole request
+
+    def __init__(self, app):
+        self.app = app
+
+    def route_template(self, scope) -> str:
+        for route in scope["app"].routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        current_endpoint.set(self.route_template(scope))
+        with timed("request", section=""):
+            await self.app(scope, receive, send)
+
+class StatsCollector:
+    # Exports the in-process singleflight and governor counters kept for /stats
+
+    def collect(self):
+        coalescing = CounterMetricFamily("lean_singleflight", "Single-flight outcomes", labels=["outcome"])
+        for outcome, count in singleflight.stats.items():
+            coalescing.add_metric([outcome], count)
+        yield coalescing
+
+        rate = GaugeMetricFamily("lean_upstream_rate", "Current adaptive rate limit (calls/s)", labels=["provider"])
+        circuit = GaugeMetricFamily("lean_upstream_circuit_open", "1 while the provider's circuit is open", labels=["provider"])
+        for governor in (perplexity_governor, translate_governor):
+            rate.add_metric([governor.provider], governor.bucket.rate)
+            circuit.add_metric([governor.provider], 0 if governor.breaker.state == "closed" else 1)
+        yield rate
+        yield circuit
+
+REGISTRY.register(StatsCollector())
+
+app.add_middleware(MetricsLabelMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -56,67 +1502,344 @@ app.add_middleware(
 async def connect():
     return {"status": "success"}
 
+@app.get("/metrics")
+async def metrics():
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Aggregate across uvicorn/gunicorn worker processes
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "status": "success",
+        "data": {
+            "singleflight": singleflight.stats,
+            "batch": {"queued": batch_queue.qsize(), "workers": len(batch_workers)},
+            "prewarm": {**prewarm_stats, "running": prewarm_task is not None and not prewarm_task.done()},
+            "entities": {"aliases": len(entity_index.aliases), "entities": len(entity_index.entities), **entity_index.stats},
+            "cache": {**await cache_memory(), "tiers": tier_stats, "l1": local_cache.snapshot()},
+            "upstream": {
+                "perplexity": perplexity_governor.snapshot(),
+                "translate": translate_governor.snapshot(),
+            },
+        },
+    }
+
 # Main endpoint to retrieve all information
 @app.get("/retrieve/summary")
 async def retrieve_summary(name: str, province: str = "", municipality: str = ""):
-    cache_key = generate_cache_key(name)
+    # Any known spelling of the politician shares one summary
+    name, province, municipality = await entity_index.resolve(name, province, municipality)
+    cache_key = generate_cache_key(name, province, municipality)
     
     # Try to get the cached data from Redis
-    cached_data = rd.get(cache_key)
+    cached_data = await cache_get(cache_key)
     
     if cached_data:
-        # If cached data exists, parse the JSON string back into a Python object
-        return {"status": "success", "data": json.loads(cached_data)}
-    
-    # Retrieve data from all other endpoints
-
-    names, desc, careers, dynasty, legislations, education, projects, cases = await asyncio.gather(
-        retrieve_names(name, province, municipality),
-        retrieve_desc(name, province, municipality),
-        retrieve_career(name, province, municipality),
-        retrieve_dynasty(name, province, municipality),
-        retrieve_bills(name, province, municipality),
-        retrieve_education(name, province, municipality),
-        retrieve_projects(name,province, municipality),
-        retrieve_cases(name, province, municipality)
-    )
+        return {"status": "success", "data": cached_data}
+
+    summary = await load_summary(cache_key, name, province, municipality)
 
+    return {"status": "success", "data": summary}
+
+async def load_summary(cache_key: str, name: str, province: str = "", municipality: str = "") -> dict:
+    # Concurrent misses for the same name wait on a single computation
+    return await singleflight.do(
+        cache_key,
+        lambda: compute_summary(cache_key, name, province, municipality),
+        lambda: cache_get(cache_key),
+    )
 
-    nameDict = names.get("data", [])
+# Summary field filled by each section other than names
+SUMMARY_FIELDS = {
+    "desc": "description",
+    "cases": "cases",
+    "career": "careers",
+    "dynasty": "dynasty",
+    "bills": "legislations",
+    "education": "education",
+    "projects": "projects",
+}
+
+def merge_summary(sections: dict) -> dict:
+    names = sections.get("names")
+    if not isinstance(names, dict):
+        names = {}
 
     # Combine data into a single response, leaving empty fields if no data is found
     summary = {
-        "commonName": nameDict.get("commonName", []),
-        "legalName": nameDict.get("legalName", []),
-        "description": desc.get("data", []),
-        "cases": cases.get("data", []),
-        "careers": careers.get("data", []),
-        "dynasty": dynasty.get("data", []),
-        "legislations": legislations.get("data", []),
-        "education": education.get("data", []),
-        "projects": projects.get("data", []),
+        "commonName": names.get("commonName", []),
+        "legalName": names.get("legalName", []),
     }
-    
+    for section, field in SUMMARY_FIELDS.items():
+        summary[field] = sections.get(section, [])
+
     # Ensure that fields that did not return any data are empty strings
     for key in summary:
         if not summary[key]:
             summary[key] = ""
-
-    rd.set(cache_key, json.dumps(summary))
-
-
-    return {"status": "success", "data": summary}
+    return summary
+
+def split_summary(summary: dict) -> dict:
+    sections = {"names": {"commonName": summary.get("commonName", ""), "legalName": summary.get("legalName", "")}}
+    for section, field in SUMMARY_FIELDS.items():
+        sections[section] = summary.get(field, "")
+    return sections
+
+async def adopt_sections(name: str, province: str, municipality: str) -> str:
+    # The names section may have just taught the index a canonical name for this spelling. Its sections
+    # move under that name, where every spelling looks them up once the summary expires, instead of
+    # being orphaned under the spelling. Returns the canonical summary key.
+    canonical = await entity_index.resolve(name, province, municipality)
+    old_keys = [generate_section_key(section, name, province, municipality) for section in SECTION_PROMPTS]
+    new_keys = [generate_section_key(section, *canonical) for section in SECTION_PROMPTS]
+    if old_keys == new_keys:
+        return generate_cache_key(*canonical)
+    try:
+        entries = await cache_mget(old_keys + new_keys)
+        found, moving = [], []
+        for old, new, entry, existing in zip(old_keys, new_keys, entries, entries[len(old_keys):]):
+            if entry is not None:
+                found.append(old)
+                # The canonical name may have its own copy already, which is kept
+                if existing is None:
+                    moving.append((old, new, entry))
+        if moving:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for old, _, _ in moving:
+                    pipe.pttl(old)
+                ttls = await pipe.execute()
+            # Moved with the time they had left; -2 means it expired meanwhile, -1 that it never expires
+            await asyncio.gather(*(
+                cache_set(new, entry, ttl=-(-ttl // 1000) if ttl > 0 else None)
+                for (_, new, entry), ttl in zip(moving, ttls) if ttl != -2
+            ))
+        if found:
+            await cache_delete(found)
+    except Exception as e:
+        logger.warning("Could not move the sections of %s under %s: %r", name, canonical[0], e)
+    return generate_cache_key(*canonical)
+
+async def cache_summary(keys: set, summary: dict, stale: set):
+    # Stored under the spelling asked for and the canonical name, so the next spelling does not fan out again
+    await cache_set_many(dict.fromkeys(keys, summary), ttl=STALE_SUMMARY_TTL if stale else SUMMARY_TTL)
+
+async def compute_summary(cache_key: str, name: str, province: str, municipality: str):
+    stale = set()
+    stale_sections.set(stale)
+
+    # Retrieve every section, each served from its own section cache
+    planned = await plan_sections(name, province, municipality)
+    responses = await asyncio.gather(*planned.values(), return_exceptions=True)
+
+    # One failing section leaves its field empty instead of failing the whole summary
+    failed = [response for response in responses if isinstance(response, Exception)]
+    if len(failed) == len(responses):
+        raise failed[0]
+    sections = {
+        section: response.get("data")
+        for section, response in zip(planned, responses)
+        if not isinstance(response, Exception)
+    }
+    # Cut-off sections are refetched on their next read; keep the summary only until then
+    stale.update(
+        section for section, response in zip(planned, responses)
+        if not isinstance(response, Exception) and response.get("partial")
+    )
+    record_completeness(sections, [section for section in planned if section not in sections])
+    summary = merge_summary(sections)
+
+    # Sections that succeeded are in their own caches; a partial summary is not kept
+    canonical_key = await adopt_sections(name, province, municipality)
+    if not failed:
+        await cache_summary({cache_key, canonical_key}, summary, stale)
+
+    return summary
+
+class IncrementalJSONParser:
+    # Tolerant streaming parser for model output. Yields each element of the top-level arrays
+    # (e.g. every case in {"cases": [...]}) as soon as it closes, and can fall back to those
+    # elements when the rest of the document is truncated or malformed.
+    # Prose around the document may contain brackets of its own, such as citation markers [1]
+    # or {placeholders}. After an opening code fence, the first root that parses is the document.
+    # Without a fence, a root that does not parse is skipped and the longest one that does wins.
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.fenced = False
+        self.done = False
+        # (length, value, partial) of every root found so far
+        self.candidates: list[tuple[int, object, bool]] = []
+        self.partial = False
+        self.reset_root()
+
+    def reset_root(self):
+        self.root_start = None
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_root_string = None
+        self.array_key = None
+        self.element_start = None
+        self.items: dict[str | None, list] = {}
+
+    def at_item_level(self) -> bool:
+        # Directly inside a root array, or inside an array that is a value of the root object
+        return self.stack == ["["] or self.stack == ["{", "["]
+
+    def feed(self, chunk: str) -> list[tuple[str | None, object]]:
+        self.buffer += chunk
+        completed = []
+        buffer = self.buffer
+        i = self.position
+
+        while i < len(buffer) and not self.done:
+            char = buffer[i]
+            if self.root_start is None:
+                if char == "`" and not self.fenced:
+                    if len(buffer) - i < 3:
+                        # Could be the start of a fence; wait for the rest
+                        break
+                    if buffer.startswith("```", i):
+                        end = buffer.find("\n", i)
+                        if end == -1:
+                            break
+                        # Everything before the opening fence was prose
+                        self.fenced = True
+                        self.candidates = []
+                        i = end + 1
+                        continue
+                elif char in "{[":
+                    self.root_start = i
+                    self.stack.append(char)
+            elif self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.element_start is not None and self.at_item_level():
+                        self.emit(buffer[self.element_start:i + 1], completed)
+                    elif self.stack == ["{"]:
+                        try:
+                            self.last_root_string = json.loads(buffer[self.string_start:i + 1])
+                        except ValueError:
+                            self.last_root_string = None
+            elif char == '"':
+                self.in_string = True
+                self.string_start = i
+                if self.at_item_level():
+                    self.element_start = i
+            elif char in "{[":
+                if self.at_item_level():
+                    self.element_start = i
+                elif char == "[" and self.stack == ["{"]:
+                    self.array_key = self.last_root_string
+                self.stack.append(char)
+            elif char in "}]":
+                if {"}": "{", "]": "["}[char] != self.stack[-1]:
+                    i = self.abandon_root(i)
+                    continue
+                self.stack.pop()
+                if not self.stack:
+                    i = self.close_root(i + 1)
+                    continue
+                if self.at_item_level() and self.element_start is not None:
+                    self.emit(buffer[self.element_start:i + 1], completed)
+            i += 1
+
+        self.position = i
+        return completed
+
+    def close_root(self, end: int) -> int:
+        # Returns where scanning resumes
+        start = self.root_start
+        try:
+            value = json.loads(self.buffer[start:end])
+        except ValueError:
+            return self.abandon_root(end - 1)
+        if isinstance(value, list) and value and all(isinstance(item, (int, float)) for item in value):
+            # Citation markers such as [1] or [2, 3]; no section answers with a list of numbers
+            self.reset_root()
+            return start + 1
+        self.candidates.append((end - start, value, False))
+        self.done = self.fenced
+        self.reset_root()
+        return end
+
+    def abandon_root(self, position: int) -> int:
+        # A root that turned out not to be JSON. If elements inside it closed, it was the document
+        # and broke part-way; otherwise it was prose, so look again from just after its opening bracket.
+        start = self.root_start
+        if self.items:
+            self.candidates.append((position - start, self.collected(), True))
+            self.reset_root()
+            return position + 1
+        self.reset_root()
+        return start + 1
+
+    def collected(self):
+        return self.items[None] if None in self.items else dict(self.items)
+
+    def emit(self, text: str, completed: list):
+        self.element_start = None
+        key = self.array_key if self.stack[0] == "{" else None
+        try:
+            item = json.loads(text)
+        except ValueError:
+            return
+        self.items.setdefault(key, []).append(item)
+        completed.append((key, item))
+
+    def result(self):
+        candidates = list(self.candidates)
+        if self.root_start is not None and self.items:
+            # Truncated: keep the elements that did close
+            candidates.append((len(self.buffer) - self.root_start, self.collected(), True))
+        if not candidates:
+            raise ValueError("No JSON document found in completion")
+        _, value, self.partial = max(candidates, key=lambda candidate: candidate[0])
+        return value
+
+def parse_completion(content: str):
+    parser = IncrementalJSONParser()
+    parser.feed(content)
+    return parser.result()
+
+PH_SOURCES = "Get information strictly only from these reputable Philippine sources: .ph, gov.ph, edu.ph, gov, ph, mb.com.ph, gmanetwork.com, inquirer.net, pna.gov.ph, rappler.com, abs-cbn.com, philstar.com, and manilatimes.net."
+SYSTEM_PROMPT = f"Eleborate on description asked by users. Generate it strictly as JSON following the requested schema. If no data is found, leave fields empty (empty string or empty list) but **never fabricate data** or **generate hallucinations**. Never use wikipedia and britanica as source. Don't output anything other than the json format required. If no information found just return the schema requested with empty strings as values in each fields. No text outside of the required json. {PH_SOURCES}"
+
+# fanout: one prompt per section; combined: every section in one prompt; grouped: one prompt per SECTION_GROUPS entry
+RETRIEVAL_STRATEGY = os.getenv("RETRIEVAL_STRATEGY", "fanout").lower()
+SECTION_GROUPS = [
+    [section.strip() for section in group.split(",") if section.strip()]
+    for group in os.getenv("SECTION_GROUPS", "names,desc,education,dynasty;career,projects;bills,cases").split(";")
+]
+
+PERPLEXITY_STREAM = os.getenv("PERPLEXITY_STREAM", "").lower() in ("1", "true", "yes")
+
+# Called with every array element as it streams in; set by /retrieve/summary/stream
+item_listener: ContextVar = ContextVar("item_listener", default=None)
 
 # Helper function to avoid code duplication
-async def get_response(prompt: str):
-    url = "https://api.perplexity.ai/chat/completions"
+async def get_response(prompt: str, stream: bool | None = None):
+    if stream is None:
+        stream = PERPLEXITY_STREAM
 
     payload = {
         "model": "llama-3.1-sonar-small-128k-online",
         "messages": [
             {
                 "role": "system",
-                "content": "Eleborate on description asked by users. Generate it strictly as JSON following the requested schema. If no data is found, leave fields empty (empty string or empty list) but **never fabricate data** or **generate hallucinations**. Never use wikipedia and britanica as source. Don't output anything other than the json format required. If no information found just return the schema requested with empty strings as values in each fields. No text outside of the required json. Get information strictly only from these reputable Philippine sources: .ph, gov.ph, edu.ph, gov, ph, mb.com.ph, gmanetwork.com, inquirer.net, pna.gov.ph, rappler.com, abs-cbn.com, philstar.com, and manilatimes.net."
+                "content": SYSTEM_PROMPT
             },
             {
                 "role": "user",
@@ -130,7 +1853,7 @@ async def get_response(prompt: str):
         "return_related_questions": False,
         "search_recency_filter": "month",
         "top_k": 0,
-        "stream": False,
+        "stream": stream,
         "presence_penalty": 0,
         "frequency_penalty": 1
     }
@@ -138,43 +1861,105 @@ async def get_response(prompt: str):
     headers = {
         "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
         "Content-Type": "application/json",
-        "Accept": "application/json"
+        "Accept": "text/event-stream" if stream else "application/json"
     }
 
     try:
-        response = await asyncio.to_thread(requests.post, url, json=payload, headers=headers, timeout=30)
-
-        data = response.json()
-
-        print(data)
-        json_string = data["choices"][0]["message"]["content"]
-
-        match = re.search(r"```(.*?)```", json_string, re.DOTALL)
-        if match:
-            json_string = match.group(1)
-
-        json_string = json_string.strip("```json\n").strip("\n```")
-
-        print(json_string)
-
-        json_object = json.loads(json_string)
+        if stream:
+            parser = await perplexity_governor.call(lambda: stream_completion(payload, headers))
+        else:
+            json_string = await perplexity_governor.call(lambda: post_completion(payload, headers))
+
+            log_payload("completion", json_string)
+
+            # Tolerates code fences and stray text around the JSON document
+            with timed("parse"):
+                parser = IncrementalJSONParser()
+                parser.feed(json_string)
+        json_object = parser.result()
+        if parser.partial:
+            # Truncated or broken part-way; callers keep it out of the long-lived caches
+            return {"status": "success", "data": json_object, "partial": True}
         return {"status": "success", "data": json_object}
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=400, detail="error")
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after or 1))})
+    except UpstreamError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+def record_usage(usage):
+    # Perplexity reports the billed prompt and completion tokens with every completion
+    if not isinstance(usage, dict):
+        return
+    for kind in ("prompt", "completion"):
+        tokens = usage.get(f"{kind}_tokens")
+        if isinstance(tokens, int):
+            UPSTREAM_TOKENS.labels(current_endpoint.get(), current_section.get(), RETRIEVAL_STRATEGY, kind).inc(tokens)
+
+def classify_response(response: httpx.Response):
+    # Raises UpstreamError for anything other than a 2xx answer
+    if response.status_code < 400:
+        return
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    retryable = response.status_code == 429 or response.status_code >= 500
+    raise UpstreamError("perplexity", f"HTTP {response.status_code}", response.status_code, retryable, retry_after)
+
+async def post_completion(payload: dict, headers: dict) -> str:
+    try:
+        async with host_semaphore(PERPLEXITY_URL):
+            with timed("upstream"), upstream_inflight("perplexity"):
+                response = await get_http_client().post(PERPLEXITY_URL, json=payload, headers=headers)
+    except httpx.HTTPError as e:
+        raise UpstreamError("perplexity", repr(e), retryable=True)
 
-# Define endpoints for specific information requests
+    classify_response(response)
+    try:
+        body = response.json()
+        content = body["choices"][0]["message"]["content"]
+    except (ValueError, KeyError, IndexError, TypeError):
+        # A 200 without a completion is a provider fault, and usually transient
+        raise UpstreamError("perplexity", "malformed completion", response.status_code, retryable=True)
+    record_usage(body.get("usage"))
+    return content
+
+async def stream_completion(payload: dict, headers: dict) -> IncrementalJSONParser:
+    parser = IncrementalJSONParser()
+    listener = item_listener.get()
+    emitted = False
+    usage = None
 
-@app.get("/retrieve/cases")
-async def retrieve_cases(name: str, province: str, municipality: str):
-    
-    if not province:
-        province = ""
+    try:
+        async with host_semaphore(PERPLEXITY_URL):
+            with timed("upstream"), upstream_inflight("perplexity"):
+                async with get_http_client().stream("POST", PERPLEXITY_URL, json=payload, headers=headers) as response:
+                    classify_response(response)
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        chunk = line[len("data:"):].strip()
+                        if chunk == "[DONE]":
+                            break
+                        message = json.loads(chunk)
+                        usage = message.get("usage") or usage
+                        choices = message.get("choices") or [{}]
+                        delta = choices[0].get("delta", {}).get("content") or ""
+                        for key, item in parser.feed(delta):
+                            emitted = True
+                            if listener is not None:
+                                # A combined answer interleaves sections; the array key says whose item it is
+                                listener(SECTION_BY_KEY.get(key, current_section.get()), item)
+    except (httpx.HTTPError, ValueError) as e:
+        if not emitted:
+            raise UpstreamError("perplexity", repr(e), retryable=True)
+        # Items already went out to the client, so keep what closed instead of retrying
+
+    record_usage(usage)
+    return parser
 
-    if not municipality:
-        municipality = ""
+# Define endpoints for specific information requests
 
-    prompt = f"""
-        Get me all the legal cases involving {name} ({province} {municipality}) from **credible article sources such as news articles in the Philippines and government websites** (e.g., .ph sources). Be neutral in tone without bias. This does not have to be an active case. Get information strictly only from these reputable Philippine sources: .ph, gov.ph, edu.ph, gov, ph, mb.com.ph, gmanetwork.com, inquirer.net, pna.gov.ph, rappler.com, abs-cbn.com, philstar.com, and manilatimes.net. Cases refers to the criminal, civil, administrative, tax evasion, graft, corruption, etc which is something negative. This refers to something negative associated that comes with government and legal action. Elaborate with description. If no information found just return the schema requested with empty strings as values in each fields. No text outside of the required json. Return the data in strict JSON format following the schema:
+def cases_prompt(name: str, province: str, municipality: str) -> str:
+    return f"""
+        Get me all the legal cases involving {name} ({province} {municipality}) from **credible article sources such as news articles in the Philippines and government websites** (e.g., .ph sources). Be neutral in tone without bias. This does not have to be an active case. {PH_SOURCES} Cases refers to the criminal, civil, administrative, tax evasion, graft, corruption, etc which is something negative. This refers to something negative associated that comes with government and legal action. Elaborate with description. If no information found just return the schema requested with empty strings as values in each fields. No text outside of the required json. Return the data in strict JSON format following the schema:
         {{
         "cases": [
             {{
@@ -187,10 +1972,9 @@ async def retrieve_cases(name: str, province: str, municipality: str):
         ]}}
         If no cases are found, maintain the schema the fields set as empty string "".
         """
-    return await get_response(prompt)
 
-@app.get("/retrieve/dynasty")
-async def retrieve_dynasty(name: str, province: str, municipality: str):
+@app.get("/retrieve/cases")
+async def retrieve_cases(name: str, province: str, municipality: str):
     
     if not province:
         province = ""
@@ -198,8 +1982,13 @@ async def retrieve_dynasty(name: str, province: str, municipality: str):
     if not municipality:
         municipality = ""
 
-    prompt = f"""
-        Get me all the political relatives and dynasty details of {name} ({province} {municipality}) from **credible article sources such as news articles in the Philippines and government websites** (e.g., .ph sources). Be neutral in tone without bias. Get information strictly only from these reputable Philippine sources: .ph, gov.ph, edu.ph, gov, ph, mb.com.ph, gmanetwork.com, inquirer.net, pna.gov.ph, rappler.com, abs-cbn.com, philstar.com, and manilatimes.net. This refers to the person biologically related to the person requested and should be an actual person in a government position or previously held government position. They may have also held position in provincial government positions. This can refer to mother, father, son, daughter, cousin, uncle, aunt, etc. Elaborate with description. Never use wikipedia and britanica. If no information found just return the schema requested with empty strings as values in each fields. No text outside of the required json. Return the data in strict JSON format following the schema:
+    name, province, municipality = await entity_index.resolve(name, province, municipality)
+    prompt = cases_prompt(name, province, municipality)
+    return await cached_section("cases", name, province, municipality, prompt)
+
+def dynasty_prompt(name: str, province: str, municipality: str) -> str:
+    return f"""
+        Get me all the political relatives and dynasty details of {name} ({province} {municipality}) from **credible article sources such as news articles in the Philippines and government websites** (e.g., .ph sources). Be neutral in tone without bias. {PH_SOURCES} This refers to the person biologically related to the person requested and should be an actual person in a government position or previously held government position. They may have also held position in provincial government positions. This can refer to mother, father, son, daughter, cousin, uncle, aunt, etc. Elaborate with description. Never use wikipedia and britanica. If no information found just return the schema requested with empty strings as values in each fields. No text outside of the required json. Return the data in strict JSON format following the schema:
         {{
         "dynasty": [
             {{
@@ -212,10 +2001,9 @@ async def retrieve_dynasty(name: str, province: str, municipality: str):
         ]}}
         If no dynasty details are found, leave the fields empty (e.g., "" for string fields, [] for list fields).
         """
-    return await get_response(prompt)
 
-@app.get("/retrieve/career")
-async def retrieve_career(name: str, province: str, municipality: str):
+@app.get("/retrieve/dynasty")
+async def retrieve_dynasty(name: str, province: str, municipality: str):
     
     if not province:
         province = ""
@@ -223,8 +2011,13 @@ async def retrieve_career(name: str, province: str, municipality: str):
     if not municipality:
         municipality = ""
 
-    prompt = f"""
-        Get me all career details of {name} ({province} {municipality}) from **credible article sources such as news articles in the Philippines and government websites** (e.g., .ph sources). Be neutral in tone without bias.  Get information strictly only from these reputable Philippine sources: .ph, gov.ph, edu.ph, gov, ph, mb.com.ph, gmanetwork.com, inquirer.net, pna.gov.ph, rappler.com, abs-cbn.com, philstar.com, and manilatimes.net. Elaborate with description. Never use wikipedia and britanica. Career may refer not only to political or government position but also non government position. Return the data in strict JSON format following the schema:
+    name, province, municipality = await entity_index.resolve(name, province, municipality)
+    prompt = dynasty_prompt(name, province, municipality)
+    return await cached_section("dynasty", name, province, municipality, prompt)
+
+def career_prompt(name: str, province: str, municipality: str) -> str:
+    return f"""
+        Get me all career details of {name} ({province} {municipality}) from **credible article sources such as news articles in the Philippines and government websites** (e.g., .ph sources). Be neutral in tone without bias.  {PH_SOURCES} Elaborate with description. Never use wikipedia and britanica. Career may refer not only to political or government position but also non government position. Return the data in strict JSON format following the schema:
         {{
         "careers": [
             {{
@@ -237,10 +2030,9 @@ async def retrieve_career(name: str, province: str, municipality: str):
         ]}}
         If no career information is found, maintain the schema the fields set as empty string "".
         """
-    return await get_response(prompt)
 
-@app.get("/retrieve/projects")
-async def retrieve_projects(name: str, province: str, municipality: str):
+@app.get("/retrieve/career")
+async def retrieve_career(name: str, province: str, municipality: str):
     
     if not province:
         province = ""
@@ -248,8 +2040,13 @@ async def retrieve_projects(name: str, province: str, municipality: str):
     if not municipality:
         municipality = ""
 
-    prompt = f"""
-        Get me all the projects associated with {name} ({province} {municipality}) from **credible article sources such as news articles in the Philippines and government websites** (e.g., .ph sources). Be neutral in tone without bias. Get information strictly only from these reputable Philippine sources: .ph, gov.ph, edu.ph, gov, ph, mb.com.ph, gmanetwork.com, inquirer.net, pna.gov.ph, rappler.com, abs-cbn.com, philstar.com, and manilatimes.net. Projects refer to the actual government initiatives such as programs, outreach, and etc. Never use wikipedia and britanica. If no information found just return the schema requested with empty strings as values in each fields. No text outside of the required json. Return the data in strict JSON format following the schema:
+    name, province, municipality = await entity_index.resolve(name, province, municipality)
+    prompt = career_prompt(name, province, municipality)
+    return await cached_section("career", name, province, municipality, prompt)
+
+def projects_prompt(name: str, province: str, municipality: str) -> str:
+    return f"""
+        Get me all the projects associated with {name} ({province} {municipality}) from **credible article sources such as news articles in the Philippines and government websites** (e.g., .ph sources). Be neutral in tone without bias. {PH_SOURCES} Projects refer to the actual government initiatives such as programs, outreach, and etc. Never use wikipedia and britanica. If no information found just return the schema requested with empty strings as values in each fields. No text outside of the required json. Return the data in strict JSON format following the schema:
         {{
         "projects": [
             {{
@@ -263,10 +2060,9 @@ async def retrieve_projects(name: str, province: str, municipality: str):
         ]}}
         If no project information is found, maintain the schema the fields set as empty string "".
         """
-    return await get_response(prompt)
 
-@app.get("/retrieve/bills")
-async def retrieve_bills(name: str, province: str, municipality: str):
+@app.get("/retrieve/projects")
+async def retrieve_projects(name: str, province: str, municipality: str):
     
     if not province:
         province = ""
@@ -274,7 +2070,12 @@ async def retrieve_bills(name: str, province: str, municipality: str):
     if not municipality:
         municipality = ""
 
-    prompt = f"""
+    name, province, municipality = await entity_index.resolve(name, province, municipality)
+    prompt = projects_prompt(name, province, municipality)
+    return await cached_section("projects", name, province, municipality, prompt)
+
+def bills_prompt(name: str, province: str, municipality: str) -> str:
+    return f"""
        Get me all the bills related to {name} he authored and one he co-authored were passed into law. Return the information strictly from credible Philippine sources, including senate.gov.ph** and verafiles.org. Use the official data available from these sites and provide valid links. Elaborate  description. Be neutral in tone without bias. Clearly state whether the bill was **authored or co-authored. Provide an **elaborate description** of each bill, including any additional context or legislative importance. Never use wikipedia and britanica. Return the data in strict JSON format following the schema:
         {{
         "legislations": [
@@ -289,10 +2090,9 @@ async def retrieve_bills(name: str, province: str, municipality: str):
         ]}}
         If no bills are found, maintain the schema the fields set as empty string "".
         """
-    return await get_response(prompt)
 
-@app.get("/retrieve/education")
-async def retrieve_education(name: str, province: str, municipality: str):
+@app.get("/retrieve/bills")
+async def retrieve_bills(name: str, province: str, municipality: str):
     
     if not province:
         province = ""
@@ -300,8 +2100,13 @@ async def retrieve_education(name: str, province: str, municipality: str):
     if not municipality:
         municipality = ""
 
-    prompt = f"""
-        Get me all the educational attainments such as college degrees of {name} ({province} {municipality}) from **credible article sources such as news articles in the Philippines and government websites** (e.g., .ph sources). Make sure college degree was completed. Be neutral. Be neutral in tone without bias.  Get information strictly only from these reputable Philippine sources: .ph, gov.ph, edu.ph, gov, ph, mb.com.ph, gmanetwork.com, inquirer.net, pna.gov.ph, rappler.com, abs-cbn.com, philstar.com, and manilatimes.net. Elaborate description. Never use wikipedia and britanica. If no information found just return the schema requested with empty strings as values in each fields. No text outside of the required json. Return the data in strict JSON format following the schema:
+    name, province, municipality = await entity_index.resolve(name, province, municipality)
+    prompt = bills_prompt(name, province, municipality)
+    return await cached_section("bills", name, province, municipality, prompt)
+
+def education_prompt(name: str, province: str, municipality: str) -> str:
+    return f"""
+        Get me all the educational attainments such as college degrees of {name} ({province} {municipality}) from **credible article sources such as news articles in the Philippines and government websites** (e.g., .ph sources). Make sure college degree was completed. Be neutral. Be neutral in tone without bias.  {PH_SOURCES} Elaborate description. Never use wikipedia and britanica. If no information found just return the schema requested with empty strings as values in each fields. No text outside of the required json. Return the data in strict JSON format following the schema:
         {{
         "education": [
             {{
@@ -314,61 +2119,155 @@ async def retrieve_education(name: str, province: str, municipality: str):
         ]}}
         If no educational information is found, maintain the schema the fields set as empty string "".
         """
-    return await get_response(prompt)
+
+@app.get("/retrieve/education")
+async def retrieve_education(name: str, province: str, municipality: str):
+    
+    if not province:
+        province = ""
+
+    if not municipality:
+        municipality = ""
+
+    name, province, municipality = await entity_index.resolve(name, province, municipality)
+    prompt = education_prompt(name, province, municipality)
+    return await cached_section("education", name, province, municipality, prompt)
 
   
+# Fields translated in each summary section, keyed by section -> (list key, item fields)
+TRANSLATABLE_FIELDS = {
+    "careers": ("careers", ("title", "description")),
+    "dynasty": ("dynasty", ("relation", "currentPosition")),
+    "cases": ("cases", ("description",)),
+    "legislations": ("legislations", ("description",)),
+    "projects": ("projects", ("description",)),
+}
+
+# The v2 API accepts at most 128 segments per request
+TRANSLATE_BATCH_SIZE = int(os.getenv("TRANSLATE_BATCH_SIZE", "100"))
+TRANSLATE_BATCH_CHARS = int(os.getenv("TRANSLATE_BATCH_CHARS", "25000"))
+TRANSLATE_CONCURRENCY = int(os.getenv("TRANSLATE_CONCURRENCY", "4"))
+TRANSLATION_TTL = int(os.getenv("CACHE_TTL_TRANSLATION", 30 * DAY))
+
+translate_limit = asyncio.Semaphore(TRANSLATE_CONCURRENCY)
+
+def generate_translation_key(text: str, target_language: str) -> str:
+    return f"translation:{target_language}:" + hashlib.md5(text.encode("utf-8")).hexdigest()
+
+def collect_translatable(document: dict) -> list[tuple[dict, str]]:
+    # Returns (container, field) slots; missing or empty fields are normalized to ""
+    slots = []
+
+    description = document.get("description")
+    if isinstance(description, dict):
+        slots.append((description, "desc"))
+
+    for section, (list_key, fields) in TRANSLATABLE_FIELDS.items():
+        wrapper = document.get(section)
+        if not isinstance(wrapper, dict) or not isinstance(wrapper.get(list_key), list):
+            continue
+        for item in wrapper[list_key]:
+            if isinstance(item, dict):
+                slots.extend((item, field) for field in fields)
+
+    for container, field in slots:
+        if not isinstance(container.get(field), str):
+            container[field] = ""
+    return slots
+
+def batch_strings(texts: list[str]) -> list[list[str]]:
+    batches, batch, size = [], [], 0
+    for text in texts:
+        if batch and (len(batch) >= TRANSLATE_BATCH_SIZE or size + len(text) > TRANSLATE_BATCH_CHARS):
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text)
+    if batch:
+        batches.append(batch)
+    return batches
+
+def is_transport_error(e: Exception) -> bool:
+    # Imported here rather than at startup; by the time a translation has failed they are loaded anyway
+    import requests
+    from google.auth.exceptions import TransportError
+
+    return isinstance(e, (requests.ConnectionError, requests.Timeout, TransportError, ConnectionError, TimeoutError))
+
+async def translate_batch(batch: list[str], target_language: str) -> list[str]:
+    async def send():
+        try:
+            async with translate_limit:
+                with timed("translate_batch", section="translate"), upstream_inflight("translate"):
+                    return await asyncio.to_thread(translate_sync, batch, target_language)
+        except Exception as e:
+            # google.api_core exceptions carry the HTTP status as .code
+            code = getattr(e, "code", None)
+            if isinstance(code, int):
+                raise UpstreamError("translate", repr(e), code, retryable=code == 429 or code >= 500)
+            if is_transport_error(e):
+                raise UpstreamError("translate", repr(e), retryable=True)
+            # Missing or bad credentials and other configuration errors: retrying will not help, and
+            # Google is not down, so they neither open the circuit nor get retried
+            raise
+
+    results = await translate_governor.call(send)
+    return [result["translatedText"] for result in results]
+
+async def translate_strings(texts: list[str], target_language: str) -> dict[str, str]:
+    # Deduplicate, serve what we can from the per-string cache, and send only misses upstream
+    unique = list(dict.fromkeys(text for text in texts if text))
+    keys = [generate_translation_key(text, target_language) for text in unique]
+    translated = {text: cached for text, cached in zip(unique, await cache_mget(keys)) if cached is not None}
+
+    misses = [text for text in unique if text not in translated]
+    batches = batch_strings(misses)
+    results = await asyncio.gather(*(translate_batch(batch, target_language) for batch in batches))
+
+    fresh = {}
+    for batch, result in zip(batches, results):
+        for text, translation in zip(batch, result):
+            translated[text] = translation
+            fresh[generate_translation_key(text, target_language)] = translation
+    await cache_set_many(fresh, ttl=TRANSLATION_TTL)
+
+    return translated
+
 class TranslationRequest(BaseModel):
     to_translate: dict
     target_language: str
 
+def translation_doc_key(document, target_language: str) -> str:
+    # The same document translated into two languages must not share an entry
+    document_hash = hashlib.md5(json.dumps(document, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"translation:doc:{target_language}:{document_hash}"
+
+async def translate_document(document, target_language: str):
+    to_translate = copy.deepcopy(document)
+    slots = collect_translatable(to_translate)
+    translated = await translate_strings([container[field] for container, field in slots], target_language)
+
+    for container, field in slots:
+        container[field] = translated.get(container[field], "")
+
+    await cache_set(translation_doc_key(document, target_language), to_translate, ttl=TRANSLATION_TTL)
+    return to_translate
+
 @app.post("/translate")
 async def translate(request: TranslationRequest):
     orig = request.to_translate
     target_language = request.target_language
 
-    cache_key = hashlib.md5(json.dumps(orig).encode("utf-8")).hexdigest()
-    to_translate = copy.deepcopy(orig)
+    cache_key = translation_doc_key(orig, target_language)
     # Try to get the cached data from Redis
-    cached_data = rd.get(cache_key)
+    cached_data = await cache_get(cache_key)
     
     if cached_data:
-        # If cached data exists, parse the JSON string back into a Python object
-        return {"status": "success", "translatedText": json.loads(cached_data)}
+        return {"status": "success", "translatedText": cached_data}
 
     try:
-        def translate_field(field: str) -> str:
-            if field:
-                print(translate_client.translate(field, target_language=target_language)['translatedText'])
-                return translate_client.translate(field, target_language=target_language)['translatedText']
-            return ""
-
-        if "description" in to_translate:
-            to_translate["description"] ["desc"]= translate_field(to_translate["description"]["desc"])
-
-        if "careers" in to_translate:
-            for career in to_translate["careers"] ["careers"]:
-                career["title"] = translate_field(career.get("title", ""))
-                career["description"] = translate_field(career.get("description", ""))
-
-        if "dynasty" in to_translate:
-            for relative in to_translate["dynasty"] ["dynasty"]:
-                relative["relation"] = translate_field(relative.get("relation", ""))
-                relative["currentPosition"] = translate_field(relative.get("currentPosition", ""))
-
-        if "cases" in to_translate:
-            for case in to_translate["cases"]["cases"]:
-                case["description"] = translate_field(case.get("description", ""))
-
-        if "legislations" in to_translate:
-            for legislation in to_translate["legislations"]["legislations"]:
-                legislation["description"] = translate_field(legislation.get("description", ""))
-
-        if "projects" in to_translate:
-            for project in to_translate["projects"]["projects"]:
-                project["description"] = translate_field(project.get("description", ""))
-
-        rd.set(cache_key, json.dumps(to_translate))
-        print(to_translate)
+        to_translate = await translate_document(orig, target_language)
+        log_payload("translation", to_translate)
         return {"status": "Successful", "translatedText": to_translate}
 
     except Exception as e:
@@ -376,6 +2275,16 @@ async def translate(request: TranslationRequest):
 
 
 
+def names_prompt(name: str, province: str, municipality: str) -> str:
+    return f"""
+        Get me the common name and the full legal name of {name} ({province} {municipality}). Be neutral in tone without bias. Get from wikipedia or other sources the full name. No text outside of the required JSON. Return the data in strict JSON format following the schema:
+        {{
+            "commonName": <String>,
+            "legalName": <String>
+        }}
+        If no info is found, maintain the schema the fields set as empty string "".
+    """
+
 @app.get("/retrieve/names")
 async def retrieve_names(name: str, province: str, municipality: str):
 
@@ -385,73 +2294,476 @@ async def retrieve_names(name: str, province: str, municipality: str):
     if not municipality:
         municipality = ""
 
-    prompt = f"""
-        Get me the common name and the full legal name of {name} ({province} {municipality}). Be neutral in tone without bias. Get from wikipedia or other sources the full name. No text outside of the required JSON. Return the data in strict JSON format following the schema:
-        {{
-            "commonName": <String>,
-            "legalName": <String>
-        }}
-        If no info is found, maintain the schema the fields set as empty string "".
-    """
-    return await get_response(prompt)
+    name, province, municipality = await entity_index.resolve(name, province, municipality)
+    prompt = names_prompt(name, province, municipality)
+    response = await cached_section("names", name, province, municipality, prompt)
+    await entity_index.learn(name, province, municipality, response.get("data"))
+    return response
+
+class Politician(BaseModel):
+    name: str
+    province: str = ""
+    municipality: str = ""
+
+class CompareRequest(BaseModel):
+    politicians: list[Politician]
+
+COMPARE_MAX_POLITICIANS = int(os.getenv("COMPARE_MAX_POLITICIANS", "10"))
+# Shared by every /compare request, so one large comparison cannot start unbounded fan-outs
+COMPARE_CONCURRENCY = int(os.getenv("COMPARE_CONCURRENCY", "4"))
+compare_limit = asyncio.Semaphore(COMPARE_CONCURRENCY)
+
+async def compare_politicians(politicians: list[Politician]):
+    if not 2 <= len(politicians) <= COMPARE_MAX_POLITICIANS:
+        raise HTTPException(status_code=400, detail=f"Compare between 2 and {COMPARE_MAX_POLITICIANS} politicians")
+
+    # Every cache entry in a single MGET, under each politician's canonical name
+    canonicals = [
+        await entity_index.resolve(politician.name, politician.province, politician.municipality)
+        for politician in politicians
+    ]
+    cache_keys = [generate_cache_key(*canonical) for canonical in canonicals]
+    cached = await cache_mget(cache_keys)
+
+    async def resolve(canonical: tuple[str, str, str], cache_key: str, cached_data):
+        if cached_data:
+            return cached_data
+        async with compare_limit:
+            return await load_summary(cache_key, *canonical)
+
+    # All misses are fetched concurrently
+    summaries = await asyncio.gather(
+        *(resolve(canonical, cache_key, cached_data) for canonical, cache_key, cached_data in zip(canonicals, cache_keys, cached))
+    )
+
+    # Section-by-section view, one entry per politician in request order
+    fields = ["commonName", "legalName", *SUMMARY_FIELDS.values()]
+    sections = {field: [summary.get(field, "") for summary in summaries] for field in fields}
+
+    return {
+        "status": "success",
+        "politicians": [politician.model_dump() for politician in politicians],
+        "data": summaries,
+        "sections": sections,
+    }
 
 @app.get("/compare")
 async def compare(name1: str, name2: str):
+    return await compare_politicians([Politician(name=name1), Politician(name=name2)])
+
+@app.post("/compare")
+async def compare_many(request: CompareRequest):
+    return await compare_politicians(request.politicians)
+
+
+class BatchRequest(BaseModel):
+    records: list[Politician]
+
+BATCH_MAX_RECORDS = int(os.getenv("BATCH_MAX_RECORDS", "5000"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+# Uncached summaries started per second across all batch jobs in this worker (each is up to eight upstream calls)
+BATCH_RATE = float(os.getenv("BATCH_RATE", "0.5"))
+BATCH_BURST = float(os.getenv("BATCH_BURST", "4"))
+BATCH_JOB_TTL = int(os.getenv("BATCH_JOB_TTL", DAY))
+# Keys per MGET when checking which records are already cached
+BATCH_MGET_CHUNK = 500
+# Attempts at recording a record's outcome while Redis is failing, with exponential backoff
+BATCH_SAVE_RETRIES = int(os.getenv("BATCH_SAVE_RETRIES", "5"))
+
+batch_queue: asyncio.Queue = asyncio.Queue()
+batch_workers: list[asyncio.Task] = []
+batch_bucket = TokenBucket(BATCH_RATE, BATCH_BURST)
+
+def batch_job_key(job_id: str) -> str:
+    return f"batch:{job_id}"
+
+def batch_results_key(job_id: str) -> str:
+    return f"batch:{job_id}:results"
+
+async def batch_cache_key(record: dict) -> str:
+    return generate_cache_key(*await entity_index.resolve(record["name"], record["province"], record["municipality"]))
+
+def ensure_batch_workers():
+    batch_workers[:] = [worker for worker in batch_workers if not worker.done()]
+    while len(batch_workers) < BATCH_WORKERS:
+        batch_workers.append(asyncio.create_task(batch_worker()))
+
+async def stop_batch_workers():
+    for worker in batch_workers:
+        worker.cancel()
+    await asyncio.gather(*batch_workers, return_exceptions=True)
+    batch_workers.clear()
+
+async def record_batch_result(job_id: str, index: int, record: dict, outcome: str, detail: str = ""):
+    result = {**record, "status": outcome}
+    if detail:
+        result["detail"] = detail
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.hset(batch_results_key(job_id), str(index), json.dumps(result))
+        pipe.hincrby(batch_job_key(job_id), "failed" if outcome == "error" else "completed", 1)
+        pipe.hmget(batch_job_key(job_id), "total", "completed", "failed", "cached")
+        *_, counts = await pipe.execute()
+
+    total, completed, failed, cached = (int(count or 0) for count in counts)
+    if completed + failed + cached >= total:
+        await get_redis().hset(batch_job_key(job_id), "status", "completed")
+
+async def save_batch_result(job_id: str, index: int, record: dict, outcome: str, detail: str = ""):
+    # A Redis outage must not end the worker: retry with backoff, then log and move on
+    for attempt in range(BATCH_SAVE_RETRIES + 1):
+        try:
+            if attempt:
+                # The failed attempt may have been applied with only its reply lost; do not count it twice
+                saved = await get_redis().hget(batch_results_key(job_id), str(index))
+                if saved is not None and json.loads(saved).get("status") != "queued":
+                    return
+            await record_batch_result(job_id, index, record, outcome, detail)
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if attempt == BATCH_SAVE_RETRIES:
+                logger.error("Could not record batch %s record %d as %s: %r", job_id, index, outcome, e)
+                return
+            delay = min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2 ** attempt)
+            logger.warning("Recording batch %s record %d failed, retrying in %.1fs: %r", job_id, index, delay, e)
+            await asyncio.sleep(delay)
+
+async def process_batch_record(record: dict) -> str:
+    canonical = await entity_index.resolve(record["name"], record["province"], record["municipality"])
+    cache_key = generate_cache_key(*canonical)
+    # An earlier record, job or request may have filled it since the job was queued
+    if await cache_exists(cache_key):
+        return "cached"
+    await batch_bucket.acquire()
+    await load_summary(cache_key, *canonical)
+    return "done"
+
+async def batch_worker():
+    while True:
+        job_id, index, record = await batch_queue.get()
+        try:
+            try:
+                outcome, detail = await process_batch_record(record), ""
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                outcome, detail = "error", str(getattr(e, "detail", "") or repr(e))
+            await save_batch_result(job_id, index, record, outcome, detail)
+        finally:
+            batch_queue.task_done()
+
+@app.post("/batch/summary")
+async def submit_batch(request: BatchRequest):
+    records = [politician.model_dump() for politician in request.records]
+    if not records or len(records) > BATCH_MAX_RECORDS:
+        raise HTTPException(status_code=400, detail=f"Submit between 1 and {BATCH_MAX_RECORDS} records")
+
+    # Skip records that are already cached, checked in chunked pipelines
+    cache_keys = [await batch_cache_key(record) for record in records]
+    cached = []
+    for start in range(0, len(cache_keys), BATCH_MGET_CHUNK):
+        cached.extend(await cache_exists_many(cache_keys[start:start + BATCH_MGET_CHUNK]))
+
+    job_id = uuid.uuid4().hex
+    results = {
+        str(index): json.dumps({**record, "status": "cached" if is_cached else "queued"})
+        for index, (record, is_cached) in enumerate(zip(records, cached))
+    }
+    queued = [(index, record) for index, (record, is_cached) in enumerate(zip(records, cached)) if not is_cached]
+    job = {
+        "status": "running" if queued else "completed",
+        "total": len(records),
+        "cached": len(records) - len(queued),
+        "completed": 0,
+        "failed": 0,
+        "created_at": int(time.time()),
+    }
 
-    cache_key1 = generate_cache_key(name1)
-    
-    # Try to get the cached data from Redis
-    cached_data1 = rd.get(cache_key1)
-    
-    if cached_data1:
-        # If cached data exists, parse the JSON string back into a Python object
-        summary1 = json.loads(cached_data1)
-    else:
-        summary1 = await retrieve_summary(name1)
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.hset(batch_job_key(job_id), mapping=job)
+        pipe.hset(batch_results_key(job_id), mapping=results)
+        pipe.expire(batch_job_key(job_id), BATCH_JOB_TTL)
+        pipe.expire(batch_results_key(job_id), BATCH_JOB_TTL)
+        await pipe.execute()
 
+    ensure_batch_workers()
+    for index, record in queued:
+        batch_queue.put_nowait((job_id, index, record))
 
-    cache_key2 = generate_cache_key(name2)
-    
-    # Try to get the cached data from Redis
-    cached_data2 = rd.get(cache_key2)
-    
-    if cached_data2:
-        # If cached data exists, parse the JSON string back into a Python object
-        summary2 = json.loads(cached_data2)
-    else:
-        summary2 = await retrieve_summary(name2)
+    return {"status": "success", "job_id": job_id, "total": job["total"], "cached": job["cached"], "queued": len(queued)}
 
-    return {"status": "success", "data": [summary1, summary2]}
+@app.get("/batch/{job_id}")
+async def get_batch(job_id: str, include_data: bool = False):
+    job = await get_redis().hgetall(batch_job_key(job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown batch job")
 
+    job = {key.decode("utf-8"): value.decode("utf-8") for key, value in job.items()}
+    for field in ("total", "cached", "completed", "failed", "created_at"):
+        job[field] = int(job.get(field, 0))
 
-@app.get("/retrieve/desc")
-async def retrieve_desc(name: str, province, municipality):
-    prompt = f"""
+    stored = await get_redis().hgetall(batch_results_key(job_id))
+    records = [json.loads(stored[key]) for key in sorted(stored, key=int)]
+
+    if include_data:
+        # Summaries live in the regular summary cache; read the finished ones in one MGET
+        finished = [record for record in records if record["status"] in ("cached", "done")]
+        summaries = await cache_mget([await batch_cache_key(record) for record in finished])
+        for record, summary in zip(finished, summaries):
+            record["data"] = summary
+
+    return {"status": "success", "job": job, "records": records}
+
+def desc_prompt(name: str, province: str, municipality: str) -> str:
+    return f"""
         Get me the short description of {name} ({province} {municipality}). Do not get data from wikipedia. Be neutral in tone without bias. No text outside of the required JSON. Return the data in strict JSON format following the schema:
         {{
             "desc": <String>
         }}
         If no info is found, maintain the schema the fields set as empty string "".
     """
-    return await get_response(prompt)
 
+@app.get("/retrieve/desc")
+async def retrieve_desc(name: str, province, municipality):
+    name, province, municipality = await entity_index.resolve(name, province, municipality)
+    prompt = desc_prompt(name, province, municipality)
+    return await cached_section("desc", name, province, municipality, prompt)
+
+
+
+
+
+# Section endpoints that make up a summary, in the order they are requested
+SUMMARY_SECTIONS = {
+    "names": retrieve_names,
+    "desc": retrieve_desc,
+    "career": retrieve_career,
+    "dynasty": retrieve_dynasty,
+    "bills": retrieve_bills,
+    "education": retrieve_education,
+    "projects": retrieve_projects,
+    "cases": retrieve_cases,
+}
+
+SECTION_PROMPTS = {
+    "names": names_prompt,
+    "desc": desc_prompt,
+    "career": career_prompt,
+    "dynasty": dynasty_prompt,
+    "bills": bills_prompt,
+    "education": education_prompt,
+    "projects": projects_prompt,
+    "cases": cases_prompt,
+}
+
+# Top-level keys of each section's schema; a combined answer carries all of them side by side
+SECTION_SCHEMA_KEYS = {
+    "names": ("commonName", "legalName"),
+    "desc": ("desc",),
+    "career": ("careers",),
+    "dynasty": ("dynasty",),
+    "bills": ("legislations",),
+    "education": ("education",),
+    "projects": ("projects",),
+    "cases": ("cases",),
+}
+SECTION_BY_KEY = {key: section for section, keys in SECTION_SCHEMA_KEYS.items() for key in keys}
+# Sections whose schema is a list of items; the others are plain strings
+LIST_SECTIONS = {"career", "dynasty", "bills", "education", "projects", "cases"}
+
+def retrieval_groups() -> list[list[str]]:
+    if RETRIEVAL_STRATEGY == "combined":
+        return [list(SUMMARY_SECTIONS)]
+    if RETRIEVAL_STRATEGY == "grouped":
+        grouped = {section for group in SECTION_GROUPS for section in group}
+        return [group for group in SECTION_GROUPS if group] + [[section] for section in SUMMARY_SECTIONS if section not in grouped]
+    return [[section] for section in SUMMARY_SECTIONS]
+
+def combined_prompt(sections: list[str], name: str, province: str, municipality: str) -> str:
+    # The source list is in the system prompt already, so it is not repeated for every section
+    keys = ", ".join(f'"{key}"' for section in sections for key in SECTION_SCHEMA_KEYS[section])
+    requests = "\n\n".join(
+        f"Request {index}: " + SECTION_PROMPTS[section](name, province, municipality).replace(PH_SOURCES, "").strip()
+        for index, section in enumerate(sections, 1)
+    )
+    return f"""
+        Answer each of the {len(sections)} requests below about {name} ({province} {municipality}). Return a single JSON object whose top-level keys are {keys}, each filled exactly as the schema of its request describes. The instructions of a request apply only to its own keys. No text outside of the required JSON.
 
+{requests}
+        """
 
+def extract_section(section: str, document) -> dict | None:
+    # A section's part of a combined answer, or None if it is missing or does not follow its schema
+    if not isinstance(document, dict):
+        return None
+    data = {}
+    for key in SECTION_SCHEMA_KEYS[section]:
+        value = document.get(key)
+        if section in LIST_SECTIONS:
+            valid = value == "" or (isinstance(value, list) and all(isinstance(item, dict) for item in value))
+        else:
+            valid = isinstance(value, str)
+        if not valid:
+            return None
+        data[key] = value
+    return data
+
+def has_content(value) -> bool:
+    if isinstance(value, dict):
+        return any(has_content(item) for item in value.values())
+    if isinstance(value, list):
+        return any(has_content(item) for item in value)
+    return bool(value.strip()) if isinstance(value, str) else value is not None
+
+def record_completeness(sections: dict, failed):
+    for section, data in sections.items():
+        SUMMARY_SECTION_RESULTS.labels(RETRIEVAL_STRATEGY, section, "filled" if has_content(data) else "empty").inc()
+    for section in failed:
+        SUMMARY_SECTION_RESULTS.labels(RETRIEVAL_STRATEGY, section, "failed").inc()
+
+async def request_group(sections: list[str], name: str, province: str, municipality: str) -> dict:
+    current_section.set("+".join(sections))
+    response = await get_response(combined_prompt(sections, name, province, municipality))
+
+    results = {}
+    for section in sections:
+        data = extract_section(section, response["data"])
+        COMBINED_SECTIONS.labels(section, "invalid" if data is None else "valid").inc()
+        if data is not None:
+            # A truncated combined answer cannot tell which of its sections were cut off
+            results[section] = {"status": "success", "data": data, **({"partial": True} if response.get("partial") else {})}
+
+    # Valid sections are cached exactly as if they had been requested alone
+    now = time.time()
+    entries = {section: section_entry(section, result, now) for section, result in results.items()}
+    await asyncio.gather(*(
+        cache_set(generate_section_key(section, name, province, municipality), entry, ttl=ttl)
+        for section, (entry, ttl) in entries.items()
+    ))
+    if "names" in results:
+        await entity_index.learn(name, province, municipality, results["names"]["data"])
+    return results
+
+async def fetch_group(sections: list[str], name: str, province: str, municipality: str) -> dict:
+    keys = [generate_section_key(section, name, province, municipality) for section in sections]
+
+    async def lookup():
+        entries = await cache_mget(keys)
+        found = {section: entry["response"] for section, entry in zip(sections, entries) if entry}
+        return found or None
+
+    flight_key = f"group:{'+'.join(sections)}:{generate_cache_key(name, province, municipality)}"
+    return await singleflight.do(flight_key, lambda: request_group(sections, name, province, municipality), lookup)
+
+async def section_from_group(section: str, group: asyncio.Task, name: str, province: str, municipality: str) -> dict:
+    try:
+        results = await group
+    except Exception as e:
+        logger.warning("Combined request for %s failed: %r", name, e)
+        results = {}
+    if section in results:
+        return results[section]
+    # Missing or malformed in the combined answer: ask for this section alone
+    return await SUMMARY_SECTIONS[section](name, province, municipality)
+
+async def plan_sections(name: str, province: str, municipality: str) -> dict:
+    # One awaitable per summary section, in SUMMARY_SECTIONS order, fetched as RETRIEVAL_STRATEGY says
+    groups = retrieval_groups()
+    if all(len(group) == 1 for group in groups):
+        return {section: fetch(name, province, municipality) for section, fetch in SUMMARY_SECTIONS.items()}
+
+    # Only sections with nothing cached, not even a stale entry, are worth a combined request
+    keys = [generate_section_key(section, name, province, municipality) for section in SUMMARY_SECTIONS]
+    cached = {section for section, exists in zip(SUMMARY_SECTIONS, await cache_exists_many(keys)) if exists}
+
+    planned = {}
+    for group in groups:
+        missing = [section for section in group if section not in cached]
+        if len(missing) > 1:
+            task = asyncio.create_task(fetch_group(missing, name, province, municipality))
+            for section in missing:
+                planned[section] = section_from_group(section, task, name, province, municipality)
+    return {
+        section: planned[section] if section in planned else fetch(name, province, municipality)
+        for section, fetch in SUMMARY_SECTIONS.items()
+    }
 
+def ndjson(message: dict) -> str:
+    return json.dumps(message) + "\n"
+
+async def stream_summary(name: str, province: str, municipality: str):
+    name, province, municipality = await entity_index.resolve(name, province, municipality)
+    cache_key = generate_cache_key(name, province, municipality)
+    cached_data = await cache_get(cache_key)
 
-@app.get("/trending")
-async def get_trending_politicians():
-    
-    cache_key = "top_10"
-    
-    # Try to get the cached data from Redis
-    cached_data = rd.get(cache_key)
-    
     if cached_data:
-        # If cached data exists, parse the JSON string back into a Python object
-        return {"status": "success", "data": json.loads(cached_data)}
-    
-    prompt = f"""
+        for section, data in split_summary(cached_data).items():
+            yield ndjson({"section": section, "status": "success", "data": data})
+        yield ndjson({"section": "summary", "status": "success", "data": cached_data})
+        return
+
+    stale = set()
+    stale_sections.set(stale)
+
+    queue = asyncio.Queue()
+    sections, errors = {}, {}
+
+    async def run_section(section: str, pending):
+        try:
+            response = await pending
+            if response.get("partial"):
+                stale.add(section)
+            queue.put_nowait((section, "success", response.get("data")))
+        except Exception as e:
+            queue.put_nowait((section, "error", str(getattr(e, "detail", "") or repr(e))))
+
+    # With PERPLEXITY_STREAM on, array elements are forwarded as the completion streams in
+    item_listener.set(lambda section, item: queue.put_nowait((section, "item", item)))
+    planned = await plan_sections(name, province, municipality)
+    tasks = [asyncio.create_task(run_section(section, pending)) for section, pending in planned.items()]
+    remaining = len(tasks)
+
+    try:
+        # Emit each section as soon as it resolves; cached sections come back first
+        while remaining:
+            section, status, payload = await queue.get()
+            if status == "item":
+                yield ndjson({"section": section, "status": "item", "data": payload})
+                continue
+            remaining -= 1
+            if status == "error":
+                errors[section] = payload
+                yield ndjson({"section": section, "status": "error", "detail": payload})
+            else:
+                sections[section] = payload
+                yield ndjson({"section": section, "status": "success", "data": payload})
+    finally:
+        # The client went away; do not leave section requests running for it
+        for task in tasks:
+            task.cancel()
+
+    record_completeness(sections, errors)
+    summary = merge_summary(sections)
+    canonical_key = await adopt_sections(name, province, municipality)
+    if errors:
+        # Sections that did resolve are already in their own caches; skip caching a partial summary
+        yield ndjson({"section": "summary", "status": "partial", "data": summary, "errors": errors})
+        return
+
+    await cache_summary({cache_key, canonical_key}, summary, stale)
+    yield ndjson({"section": "summary", "status": "success", "data": summary})
+
+@app.get("/retrieve/summary/stream")
+async def retrieve_summary_stream(name: str, province: str = "", municipality: str = ""):
+    return StreamingResponse(
+        stream_summary(name, province, municipality),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def trending_prompt() -> str:
+    return f"""
         Give me the top 10 most popular and talked about philippine politicians today. No text outside of the required JSON. Return the data in strict JSON format following the schema:
         {{
             "trending": [<String>] #list of strings
@@ -459,8 +2771,118 @@ async def get_trending_politicians():
         If no info is found, just return {{"trending": []}} empty string"".
     """
 
-    json_obj = await get_response(prompt)
-    
-    rd.set(cache_key, json.dumps(json_obj))
+@app.get("/trending")
+async def get_trending_politicians():
+    # Cached like any other section; the prewarmer also refreshes it once stale
+    json_obj = await cached_section("trending", "top_10", "", "", trending_prompt())
        
-    return {"status": "success", "data": json_obj}
\ No newline at end of file
+    return {"status": "success", "data": json_obj}
+
+# Seconds between prewarm cycles; off by default, and only meaningful for a long-running server, not serverless
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "0"))
+PREWARM_WATCHLIST = [name.strip() for name in os.getenv("PREWARM_WATCHLIST", "").split(",") if name.strip()]
+PREWARM_LANGUAGES = [language.strip() for language in os.getenv("PREWARM_LANGUAGES", "tl,ceb").split(",") if language.strip()]
+# Summaries the prewarmer starts per second; each is up to eight upstream calls
+PREWARM_RATE = float(os.getenv("PREWARM_RATE", "0.05"))
+# Share of the Perplexity burst that must be unused before a prewarm starts, so user requests come first
+PREWARM_HEADROOM = float(os.getenv("PREWARM_HEADROOM", "0.5"))
+# Summaries warmed more recently than this are skipped
+PREWARM_MAX_AGE = int(os.getenv("PREWARM_MAX_AGE", SUMMARY_TTL // 2))
+PREWARM_LOCK_KEY = "prewarm:lock"
+# Sorted set of summary keys scored by when they were last warmed
+PREWARM_FRESHNESS_KEY = "prewarm:fresh"
+
+prewarm_bucket = TokenBucket(PREWARM_RATE, 1)
+prewarm_task: asyncio.Task | None = None
+prewarm_stats = {"cycles": 0, "warmed": 0, "fresh": 0, "partial": 0, "failed": 0, "translations": 0, "last_cycle": None}
+
+async def wait_for_headroom():
+    bucket, breaker = perplexity_governor.bucket, perplexity_governor.breaker
+    while True:
+        bucket.refill()
+        if breaker.state == "closed" and bucket.tokens >= bucket.capacity * PREWARM_HEADROOM:
+            return
+        await asyncio.sleep(1)
+
+async def refresh_trending() -> list[str]:
+    # Only spends a Perplexity call once the cached list has gone stale, and only with headroom to spare
+    key = generate_section_key("trending", "top_10")
+    entry = await cache_get(key)
+    if entry is None or entry["fresh_until"] <= time.time():
+        await wait_for_headroom()
+        prompt = trending_prompt()
+        entry = await singleflight.do(key, lambda: refresh_section("trending", key, prompt), lambda: cache_get(key))
+    data = entry["response"].get("data")
+    names = data.get("trending") if isinstance(data, dict) else data
+    if not isinstance(names, list):
+        return []
+    return [name.strip() for name in names if isinstance(name, str) and name.strip()]
+
+async def prewarm_entity(name: str, province: str = "", municipality: str = ""):
+    # Trending names come from the model, so they only resolve to a known entity by exact alias
+    canonical = await entity_index.resolve(name, province, municipality, fuzzy=False)
+    cache_key = generate_cache_key(*canonical)
+    warmed_at = await get_redis().zscore(PREWARM_FRESHNESS_KEY, cache_key)
+    if warmed_at is not None and time.time() - warmed_at < PREWARM_MAX_AGE and await cache_exists(cache_key):
+        prewarm_stats["fresh"] += 1
+        return
+
+    await prewarm_bucket.acquire()
+    await wait_for_headroom()
+    summary = await load_summary(cache_key, *canonical)
+    if await get_redis().ttl(cache_key) <= STALE_SUMMARY_TTL:
+        # Not cached, or built from stale sections that are refreshing now; the next cycle finishes it
+        prewarm_stats["partial"] += 1
+        return
+
+    # Clients send the summary back to /translate as they got it, so this is the entry they will hit
+    for language in PREWARM_LANGUAGES:
+        if not await cache_exists(translation_doc_key(summary, language)):
+            await translate_document(summary, language)
+            prewarm_stats["translations"] += 1
+
+    await get_redis().zadd(PREWARM_FRESHNESS_KEY, {cache_key: time.time()})
+    prewarm_stats["warmed"] += 1
+
+async def prewarm_cycle():
+    names = list(dict.fromkeys([*await refresh_trending(), *PREWARM_WATCHLIST]))
+    keys = [generate_cache_key(*await entity_index.resolve(name, fuzzy=False)) for name in names]
+
+    # Least recently warmed first, so the coldest hot entity is never stuck behind the rest
+    scores = await get_redis().zmscore(PREWARM_FRESHNESS_KEY, keys) if keys else []
+    ordered = sorted(zip(names, scores), key=lambda pair: pair[1] or 0)
+    for name, _ in ordered:
+        try:
+            await prewarm_entity(name)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            prewarm_stats["failed"] += 1
+            logger.warning("Prewarming %s failed: %r", name, e)
+
+    await get_redis().zremrangebyscore(PREWARM_FRESHNESS_KEY, 0, time.time() - CACHE_STALE_TTL)
+    prewarm_stats["cycles"] += 1
+    prewarm_stats["last_cycle"] = int(time.time())
+
+async def prewarm_loop():
+    current_endpoint.set("prewarm")
+    while True:
+        try:
+            # One worker per interval runs the cycle; the lock simply expires
+            if await get_redis().set(PREWARM_LOCK_KEY, uuid.uuid4().hex, nx=True, ex=max(1, int(PREWARM_INTERVAL))):
+                await prewarm_cycle()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Prewarm cycle failed: %r", e)
+        await asyncio.sleep(PREWARM_INTERVAL)
+
+def start_prewarm():
+    global prewarm_task
+    if PREWARM_INTERVAL > 0 and (prewarm_task is None or prewarm_task.done()):
+        prewarm_task = asyncio.create_task(prewarm_loop())
+
+async def stop_prewarm():
+    if prewarm_task is not None:
+        prewarm_task.cancel()
+        await asyncio.gather(prewarm_task, return_exceptions=True)
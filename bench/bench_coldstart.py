@@ -0,0 +1,128 @@
+# Cold-start cost of api/main.py: each run is a fresh interpreter that imports the app,
+# serves its first request in-process and then builds the translate client. Module count
+# and RSS are taken at the first response. Pass --baseline to measure main.py from an
+# earlier commit the same way.
+#
+#   python bench/bench_coldstart.py --runs 10 --baseline HEAD~1
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from stubs import fake_service_account
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import asyncio, json, resource, sys, time
+
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+import httpx
+
+async def first_request():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.get("/")
+        response.raise_for_status()
+
+asyncio.run(first_request())
+served = time.perf_counter()
+served_at = time.time()
+modules = len(sys.modules)
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# Built at import before lazy initialization, on the first translation after
+if hasattr(main, "get_translate_client"):
+    main.get_translate_client()
+translator = time.perf_counter()
+
+print(json.dumps({
+    "served_at": served_at,
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (served - imported) * 1000,
+    "translate_client_ms": (translator - served) * 1000,
+    "modules": modules,
+    "max_rss_mb": rss,
+}))
+"""
+
+
+def run_once(app_dir: Path, env: dict) -> dict:
+    started = time.time()
+    output = subprocess.check_output([sys.executable, "-c", CHILD], cwd=app_dir, env=env, text=True)
+    sample = json.loads(output.strip().splitlines()[-1])
+    # Spawning the interpreter up to the first response: what a fresh serverless instance adds
+    sample["cold_start_ms"] = (sample.pop("served_at") - started) * 1000
+    return sample
+
+
+def slowest_imports(app_dir: Path, env: dict, top: int) -> list[tuple[str, float]]:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=app_dir, env=env, capture_output=True, text=True, check=True)
+    # -X importtime lists a module after its own imports, indented by depth, so the entries
+    # one level deep that precede the top-level "main" line are what main.py imports itself
+    packages, pending = {}, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            pending.append((name.strip().split(".")[0], int(cumulative) / 1000))
+        elif depth == 0:
+            if name.strip() == "main":
+                for package, elapsed in pending:
+                    packages[package] = packages.get(package, 0) + elapsed
+            pending = []
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def measure(label: str, app_dir: Path, env: dict, runs: int, top: int) -> dict:
+    samples = [run_once(app_dir, env) for _ in range(runs)]
+    summary = {metric: round(statistics.median(sample[metric] for sample in samples), 1) for metric in samples[0]}
+    print(f"{label:>10}  cold start {summary['cold_start_ms']:>7} ms  import {summary['import_ms']:>7} ms  "
+          f"first request {summary['first_request_ms']:>6} ms  translate client {summary['translate_client_ms']:>6} ms  "
+          f"modules {summary['modules']:>5.0f}  rss {summary['max_rss_mb']:>6} MB")
+    for package, elapsed in slowest_imports(app_dir, env, top):
+        print(f"{'':>12}{package:<24}{elapsed:>8.1f} ms")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per measurement; medians are reported")
+    parser.add_argument("--baseline", help="git revision whose api/main.py to measure as well")
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level imports to list")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["GOOGLE_API_BASE64"] = fake_service_account()
+    env.setdefault("PERPLEXITY_API_KEY", "bench")
+    env.pop("PYTHONPATH", None)
+
+    results = {}
+    if args.baseline:
+        source = subprocess.check_output(["git", "show", f"{args.baseline}:api/main.py"], cwd=ROOT, text=True)
+        with tempfile.TemporaryDirectory() as directory:
+            (Path(directory) / "main.py").write_text(source)
+            results["baseline"] = measure(args.baseline, Path(directory), env, args.runs, args.top)
+    results["current"] = measure("current", ROOT / "api", env, args.runs, args.top)
+
+    if "baseline" in results:
+        before, after = results["baseline"], results["current"]
+        print("\n" + "  ".join(
+            f"{metric} {after[metric] - before[metric]:+.1f}"
+            for metric in ("cold_start_ms", "import_ms", "first_request_ms", "modules", "max_rss_mb")
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Compares the old per-call requests.post (in a worker thread) against the shared
+# httpx.AsyncClient pool used by get_response, against a local stub server.
+#
+#   python bench/bench_http_pool.py --requests 400 --concurrency 64 --latency 0.05
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import requests
+
+from stubs import StubChatServer
+
+PAYLOAD = {"model": "stub", "messages": [{"role": "user", "content": "hi"}], "stream": False}
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def drive(call, total: int, concurrency: int) -> dict:
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--max-keepalive", type=int, default=20)
+    parser.add_argument("--per-host", type=int, default=16)
+    args = parser.parse_args()
+
+    server = await StubChatServer(latency=args.latency).start()
+    results = {}
+
+    # Before: a fresh connection per call, one default-executor thread per in-flight call
+    async def per_call():
+        response = await asyncio.to_thread(requests.post, server.url, json=PAYLOAD, timeout=30)
+        response.json()
+
+    server.reset()
+    results["requests_to_thread"] = await drive(per_call, args.requests, args.concurrency)
+    results["requests_to_thread"]["connections"] = server.connections
+
+    # After: one long-lived keep-alive pool with a per-host concurrency limit
+    client = httpx.AsyncClient(
+        timeout=httpx.Timeout(30, connect=5),
+        limits=httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_keepalive),
+    )
+    limit = asyncio.Semaphore(args.per_host)
+
+    async def pooled():
+        async with limit:
+            response = await client.post(server.url, json=PAYLOAD)
+        response.json()
+
+    server.reset()
+    results["httpx_pool"] = await drive(pooled, args.requests, args.concurrency)
+    results["httpx_pool"]["connections"] = server.connections
+
+    await client.aclose()
+    await server.stop()
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,291 @@
+# Offline load test for api/main.py. Runs the app under uvicorn against a stub
+# chat-completions server, a fake translate client and fakeredis (or a local Redis
+# with --redis-url), drives each endpoint at the given concurrency levels and
+# writes the results as JSON so runs can be compared between commits.
+#
+#   python bench/load_test.py --concurrency 1 16 64 --requests 200
+#   python bench/load_test.py --compare bench/results/<earlier>.json
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+from stubs import FakeTranslateClient, StubChatServer, sample_summary, section_content
+
+ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ("summary", "compare", "translate", "trending")
+
+
+def configure_env(args):
+    os.environ.setdefault("PERPLEXITY_API_KEY", "bench")
+    # Measure the service, not the production upstream budget
+    os.environ.setdefault("PERPLEXITY_RATE", "10000")
+    os.environ.setdefault("PERPLEXITY_BURST", "10000")
+    os.environ.setdefault("PERPLEXITY_MAX_RATE", "10000")
+    os.environ.setdefault("TRANSLATE_RATE", "10000")
+    os.environ.setdefault("TRANSLATE_BURST", "10000")
+    os.environ.setdefault("TRANSLATE_MAX_RATE", "10000")
+    os.environ.setdefault("UPSTREAM_BACKOFF_BASE", "0.05")
+    # Background prewarming would add upstream calls nobody asked for
+    os.environ.setdefault("PREWARM_INTERVAL", "0")
+    if args.stream:
+        os.environ["PERPLEXITY_STREAM"] = "1"
+    os.environ["RETRIEVAL_STRATEGY"] = args.strategy
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class LoopThread:
+    # Runs an event loop in a thread so the stand-ins and the load driver do not share the app's loop
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+class LagProbe:
+    # Event-loop lag: how late a short sleep on the app's loop wakes up
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+        self.task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(loop.time() - started - self.interval)
+
+    def start(self):
+        self.samples = []
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> dict:
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        return {
+            "p50_ms": round(percentile(self.samples, 50) * 1000, 2),
+            "p99_ms": round(percentile(self.samples, 99) * 1000, 2),
+            "max_ms": round(max(self.samples, default=0) * 1000, 2),
+        }
+
+
+def build_request(scenario: str, names: list[str], rng: random.Random, summary: dict | None):
+    if scenario == "summary":
+        return "GET", "/retrieve/summary", {"params": {"name": rng.choice(names)}}
+    if scenario == "compare":
+        picked = rng.sample(names, 2)
+        return "GET", "/compare", {"params": {"name1": picked[0], "name2": picked[1]}}
+    if scenario == "translate":
+        language = rng.choice(["tl", "ceb", "ilo"])
+        return "POST", "/translate", {"json": {"to_translate": summary, "target_language": language}}
+    return "GET", "/trending", {}
+
+
+async def drive(base_url: str, scenario: str, total: int, concurrency: int, names: list[str], seed: int,
+                summary: dict | None) -> dict:
+    rng = random.Random(seed)
+    latencies, statuses = [], {}
+    remaining = total
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                method, path, options = build_request(scenario, names, rng, summary)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **options)
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "statuses": statuses,
+    }
+
+
+async def run(args) -> dict:
+    configure_env(args)
+    sys.path.insert(0, str(ROOT / "api"))
+
+    import uvicorn
+    import main
+
+    background = LoopThread()
+    stub = StubChatServer(latency=args.upstream_latency, content=section_content,
+                          error_rate=args.error_rate, error_status=429 if args.throttle else 503)
+    background.run(stub.start())
+    main.PERPLEXITY_URL = stub.url
+
+    translator = FakeTranslateClient(latency=args.translate_latency)
+    main.translate_client = translator
+
+    if args.redis_url:
+        import redis.asyncio as aioredis
+
+        main.rd = aioredis.Redis.from_url(args.redis_url)
+    else:
+        import fakeredis
+
+        main.rd = fakeredis.aioredis.FakeRedis()
+
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=0, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+
+    names = [f"Politician {index}" for index in range(args.names)]
+    document = sample_summary()
+
+    probe = LagProbe()
+    results = []
+    for scenario in args.scenarios:
+        for concurrency in args.concurrency:
+            if not args.warm:
+                await main.rd.flushdb()
+                # Otherwise the in-process tier would answer from the previous run
+                main.local_cache.clear()
+            stub.reset()
+            translator.calls = translator.strings = 0
+
+            probe.start()
+            driver = LoopThread()
+            try:
+                measured = await asyncio.to_thread(driver.run, drive(
+                    base_url, scenario, args.requests, concurrency, names, args.seed, document))
+            finally:
+                driver.stop()
+            lag = await probe.stop()
+
+            measured.update({
+                "scenario": scenario,
+                "concurrency": concurrency,
+                "upstream": {
+                    "perplexity_requests": stub.requests,
+                    "perplexity_errors": stub.errors,
+                    "perplexity_connections": stub.connections,
+                    "perplexity_prompt_tokens": stub.prompt_tokens,
+                    "perplexity_completion_tokens": stub.completion_tokens,
+                    "translate_calls": translator.calls,
+                    "translate_strings": translator.strings,
+                },
+                "event_loop_lag": lag,
+            })
+            results.append(measured)
+            print(f"{scenario:>9} c={concurrency:<4} {measured['throughput_rps']:>8} rps  "
+                  f"p50 {measured['p50_ms']:>8} ms  p99 {measured['p99_ms']:>8} ms  "
+                  f"upstream {stub.requests:>5}  prompt tokens {stub.prompt_tokens:>7}  lag p99 {lag['p99_ms']} ms", flush=True)
+
+    server.should_exit = True
+    await serving
+    background.run(stub.stop())
+    background.stop()
+
+    return {
+        "revision": git_revision(),
+        "timestamp": int(time.time()),
+        "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        "results": results,
+    }
+
+
+def compare_runs(previous: dict, current: dict):
+    before = {(row["scenario"], row["concurrency"]): row for row in previous["results"]}
+    print(f"\ncompared with {previous.get('revision')}:")
+    for row in current["results"]:
+        old = before.get((row["scenario"], row["concurrency"]))
+        if old is None:
+            continue
+        changes = []
+        for metric in ("throughput_rps", "p50_ms", "p99_ms"):
+            if old[metric]:
+                changes.append(f"{metric} {100 * (row[metric] - old[metric]) / old[metric]:+.1f}%")
+        upstream = row["upstream"]["perplexity_requests"] - old["upstream"]["perplexity_requests"]
+        changes.append(f"upstream {upstream:+d}")
+        if old["upstream"].get("perplexity_prompt_tokens"):
+            tokens = row["upstream"]["perplexity_prompt_tokens"] / old["upstream"]["perplexity_prompt_tokens"] - 1
+            changes.append(f"prompt_tokens {100 * tokens:+.1f}%")
+        print(f"{row['scenario']:>9} c={row['concurrency']:<4} " + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--names", type=int, default=50, help="distinct politicians to draw from")
+    parser.add_argument("--upstream-latency", type=float, default=0.2)
+    parser.add_argument("--translate-latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle", action="store_true", help="inject 429s instead of 503s")
+    parser.add_argument("--stream", action="store_true", help="enable PERPLEXITY_STREAM")
+    parser.add_argument("--strategy", choices=("fanout", "combined", "grouped"), default="fanout",
+                        help="RETRIEVAL_STRATEGY for the run")
+    parser.add_argument("--warm", action="store_true", help="keep the cache between runs")
+    parser.add_argument("--redis-url", help="use a local Redis instead of fakeredis")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="defaults to bench/results/<revision>-<timestamp>.json")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    output = Path(args.output) if args.output else ROOT / "bench" / "results" / f"{report['revision']}-{report['timestamp']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nwrote {output}")
+
+    if args.compare:
+        compare_runs(json.loads(Path(args.compare).read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
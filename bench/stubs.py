@@ -0,0 +1,216 @@
+# Local stand-ins for the upstream services used by api/main.py
+import asyncio
+import base64
+import json
+import random
+import re
+import threading
+import time
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token, close enough to compare prompt sizes
+    return max(1, len(text) // 4)
+
+
+def usage_for(payload: dict, content: str) -> dict:
+    prompt = sum(estimate_tokens(message.get("content", "")) for message in payload.get("messages", []))
+    completion = estimate_tokens(content)
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+def sse_chunks(content: str, size: int, usage: dict | None = None) -> list[bytes]:
+    chunks = []
+    for start in range(0, len(content), size):
+        delta = {"choices": [{"index": 0, "delta": {"content": content[start:start + size]}}]}
+        if usage is not None and start + size >= len(content):
+            # Like the real API, the last chunk carries the usage
+            delta["usage"] = usage
+        chunks.append(f"data: {json.dumps(delta)}\n\n".encode("utf-8"))
+    chunks.append(b"data: [DONE]\n\n")
+    return chunks
+
+
+def completion_body(content: str, usage: dict | None = None) -> bytes:
+    body = {
+        "id": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+    }
+    if usage is not None:
+        body["usage"] = usage
+    return json.dumps(body).encode("utf-8")
+
+
+# Item fields of every list section, keyed by the schema key the prompt asks for
+SECTION_ITEMS = {
+    "cases": ("title", "description", "dateFiled", "link"),
+    "dynasty": ("name", "relation", "currentPosition", "link"),
+    "careers": ("title", "duration", "description", "link"),
+    "projects": ("title", "duration", "description", "status", "link"),
+    "legislations": ("title", "status", "description", "dateFiled", "link"),
+    "education": ("attained", "school", "dateCompleted", "link"),
+}
+
+
+def section_content(payload: dict, items: int = 4) -> str:
+    # Plausible answer for whichever schema the user prompt asks for, wrapped in a code fence
+    prompt = payload["messages"][-1]["content"]
+    document = {}
+    for key, fields in SECTION_ITEMS.items():
+        if re.search(rf'"{key}"\s*:\s*\[', prompt):
+            document[key] = [{field: f"{field} {index} " + "lorem ipsum " * 8 for field in fields} for index in range(items)]
+    if '"trending"' in prompt:
+        document["trending"] = [f"Politician {index}" for index in range(10)]
+    if '"commonName"' in prompt:
+        # Echo the name asked for, so distinct politicians stay distinct entities
+        asked = re.search(r"legal name of (.+?) \(", prompt)
+        common = asked.group(1) if asked else "Juan Dela Cruz"
+        document.update({"commonName": common, "legalName": f"{common} Santos"})
+    if '"desc"' in prompt:
+        document["desc"] = "lorem ipsum " * 20
+    return "```json\n" + json.dumps(document) + "\n```"
+
+
+def sample_summary(items: int = 4) -> dict:
+    # A /retrieve/summary payload in the shape clients send back to /translate
+    summary = {"commonName": "Juan Dela Cruz", "legalName": "Juan Santos Dela Cruz",
+               "description": {"desc": "lorem ipsum " * 20}}
+    for key, fields in SECTION_ITEMS.items():
+        summary[key] = {key: [{field: f"{field} {index} " + "lorem ipsum " * 8 for field in fields}
+                              for index in range(items)]}
+    return summary
+
+
+class FakeTranslateClient:
+    # Drop-in for google.cloud.translate_v2.Client; called from worker threads
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.calls = 0
+        self.strings = 0
+        self.lock = threading.Lock()
+
+    def translate(self, values, target_language=None, **kwargs):
+        single = isinstance(values, str)
+        values = [values] if single else list(values)
+        with self.lock:
+            self.calls += 1
+            self.strings += len(values)
+        time.sleep(self.latency)
+        results = [{"input": value, "translatedText": f"[{target_language}] {value}"} for value in values]
+        return results[0] if single else results
+
+
+def fake_service_account() -> str:
+    # A well-formed GOOGLE_API_BASE64 value; the key is never used against Google
+    import rsa
+
+    _, private_key = rsa.newkeys(1024)
+    account = {
+        "type": "service_account",
+        "project_id": "bench",
+        "private_key_id": "bench",
+        "private_key": private_key.save_pkcs1().decode(),
+        "client_email": "bench@bench.iam.gserviceaccount.com",
+        "client_id": "0",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }
+    return base64.b64encode(json.dumps(account).encode()).decode()
+
+
+class StubChatServer:
+    # Minimal HTTP/1.1 keep-alive server that answers every POST like the chat completions API
+    # content is either a fixed completion or a function of the request payload
+    def __init__(self, latency: float = 0.05, content='{"desc": "stub"}',
+                 chunk_size: int = 16, chunk_delay: float = 0.005,
+                 error_rate: float = 0.0, error_status: int = 503, retry_after: float | None = None):
+        self.latency = latency
+        self.content = content
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.errors = 0
+        self.connections = 0
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.server = None
+        self.port = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/chat/completions"
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def reset(self):
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Every accepted socket is one TCP (and, against the real API, TLS) handshake
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                headers = {}
+                for line in head.decode("latin-1").split("\r\n")[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                length = int(headers.get("content-length", "0"))
+                body = await reader.readexactly(length) if length else b""
+                self.requests += 1
+
+                await asyncio.sleep(self.latency)
+                if random.random() < self.error_rate:
+                    self.errors += 1
+                    body = b'{"error": "stub failure"}'
+                    writer.write(
+                        f"HTTP/1.1 {self.error_status} Error\r\nContent-Type: application/json\r\n".encode()
+                        + (f"Retry-After: {self.retry_after}\r\n".encode() if self.retry_after is not None else b"")
+                        + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+                    )
+                    await writer.drain()
+                    continue
+                payload = json.loads(body) if body else {}
+                content = self.content(payload) if callable(self.content) else self.content
+                usage = usage_for(payload, content)
+                self.prompt_tokens += usage["prompt_tokens"]
+                self.completion_tokens += usage["completion_tokens"]
+                if payload.get("stream"):
+                    # Server-sent events, delimited by closing the connection
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+                    for chunk in sse_chunks(content, self.chunk_size, usage):
+                        writer.write(chunk)
+                        await writer.drain()
+                        await asyncio.sleep(self.chunk_delay)
+                    break
+
+                body = completion_body(content, usage)
+                close = headers.get("connection", "").lower() == "close"
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n".encode()
+                    + (b"Connection: close\r\n" if close else b"Connection: keep-alive\r\n")
+                    + b"\r\n" + body
+                )
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,32 @@
+# One-off cleanup of cache entries written before entries were versioned and given a TTL. They read
+# as misses, but nothing expires or evicts them (volatile-lru only evicts keys with a TTL), so the
+# ones whose key is never requested again, and the old top_10 key, would stay in Redis for good.
+# Entries that are read are also removed behind the read; this catches the rest.
+#
+#   REDIS_HOST=... python scripts/cleanup_legacy_cache.py            # count them
+#   REDIS_HOST=... python scripts/cleanup_legacy_cache.py --delete   # unlink them
+#
+# Only string keys without a TTL and without the current entry header are touched; every key the app
+# writes itself has a TTL. Run it with the same CACHE_VERSION as the deployed app.
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+os.environ.setdefault("PERPLEXITY_API_KEY", "unused")
+
+import main
+
+
+async def run(delete: bool):
+    scanned, found = await main.sweep_legacy_entries(dry_run=not delete)
+    print(f"{scanned} keys scanned, {found} legacy entries {'removed' if delete else 'found (pass --delete to remove them)'}")
+    await main.get_redis().aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delete", action="store_true", help="unlink the legacy entries instead of only counting them")
+    asyncio.run(run(parser.parse_args().delete))
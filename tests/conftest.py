@@ -0,0 +1,21 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("PERPLEXITY_API_KEY", "test")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+import main
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    # In-memory Redis, with Lua for the tracked writes; each test drives it from its own event loop
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(main, "rd", fakeredis.aioredis.FakeRedis(server=server))
+    monkeypatch.setattr(main, "local_cache", main.LocalCache(0, 1))
+    return server
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import zlib
+
+import pytest
+
+import main
+
+
+def test_small_entry_round_trip():
+    value = {"status": "success", "data": {"desc": "ñ hi"}}
+    data = main.encode_entry("section:desc:abc", value)
+    assert data[:1] == main.CACHE_FORMAT
+    assert data[9:10] == b"j"
+    assert main.decode_entry("section:desc:abc", data) == (value, len(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")))
+
+
+def test_large_entry_is_compressed():
+    value = {"cases": [{"title": "lorem ipsum " * 20}] * 10}
+    data = main.encode_entry("section:cases:abc", value)
+    assert data[9:10] == b"z"
+    assert json.loads(zlib.decompress(data[10:])) == value
+    assert main.decode_entry("section:cases:abc", data)[0] == value
+
+
+def test_other_family_version_is_a_miss():
+    data = main.encode_entry("section:desc:abc", {"desc": "hi"})
+    assert main.decode_entry("section:cases:abc", data) == (main.VERSION_MISMATCH, 0)
+    stale = data[:1] + b"00000000" + data[9:]
+    assert main.decode_entry("section:desc:abc", stale) == (main.VERSION_MISMATCH, 0)
+
+
+def test_legacy_json():
+    # Only per-string translations are still served from plain JSON
+    assert main.decode_entry("translation:tl:abc", b'"kumusta"') == ("kumusta", 9)
+    assert main.decode_entry("abcdef", b'{"commonName": "x"}') == (main.VERSION_MISMATCH, 0)
+
+
+def test_undecodable_entry_is_a_miss():
+    assert main.decode_entry("section:desc:abc", main.CACHE_FORMAT + main.family_version("section_desc") + b"z" + b"junk") == (main.VERSION_MISMATCH, 0)
+
+
+def test_legacy_entry_without_ttl_is_removed_when_read(redis):
+    async def run():
+        rd = main.get_redis()
+        await rd.set("0123456789abcdef0123456789abcdef", json.dumps({"commonName": "x"}))
+        await rd.set("section:desc:old", b"\x01" + b"00000000" + b'j{"desc":"hi"}', ex=100)
+        assert await main.cache_get("0123456789abcdef0123456789abcdef") is None
+        assert await main.cache_get("section:desc:old") is None
+        await asyncio.gather(*main.background_tasks)
+        # Another version's entry with a TTL is left to expire or be overwritten
+        return await rd.exists("0123456789abcdef0123456789abcdef"), await rd.exists("section:desc:old")
+
+    assert asyncio.run(run()) == (0, 1)
+
+
+def test_current_entry_is_kept(redis):
+    async def run():
+        await main.cache_set("section:desc:new", {"desc": "hi"})
+        await main.remove_legacy_entries(["section:desc:new"])
+        return await main.cache_get("section:desc:new")
+
+    assert asyncio.run(run()) == {"desc": "hi"}
+
+
+def test_sweep_legacy_entries(redis):
+    async def run():
+        rd = main.get_redis()
+        await rd.set("top_10", json.dumps({"trending": []}))
+        await rd.set("0123456789abcdef0123456789abcdef", json.dumps({"commonName": "x"}))
+        await rd.set("singleflight:lock:x", "token", ex=10)
+        await rd.hset("entity:aliases", "|:bbm", "x")
+        await main.cache_set("section:desc:new", {"desc": "hi"}, ttl=100)
+        counted = await main.sweep_legacy_entries(dry_run=True)
+        removed = await main.sweep_legacy_entries()
+        return counted, removed, sorted(key.decode("utf-8") for key in await rd.keys("*"))
+
+    counted, removed, left = asyncio.run(run())
+    assert counted[1] == removed[1] == 2
+    assert left == ["entity:aliases", "section:desc:new", "singleflight:lock:x"]
@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+import pytest
+
+import main
+from main import EntityIndex, edit_distance, generate_cache_key, locality_scope, name_spelling, name_suffix
+
+
+@pytest.fixture
+def index():
+    index = EntityIndex()
+    index.load_seeds()
+    # Already loaded, so resolving does not go to Redis
+    index.loaded_at = time.monotonic()
+    return index
+
+
+def resolve(index: EntityIndex, name: str, province: str = "", municipality: str = "") -> tuple:
+    return asyncio.run(index.resolve(name, province, municipality))
+
+
+def learn(index: EntityIndex, name: str, province: str = "", municipality: str = ""):
+    canonical = (name, province, municipality)
+    index.add_entity(generate_cache_key(*canonical), canonical)
+
+
+def test_alias_resolves_to_seed(index):
+    assert resolve(index, "BBM") == ("Ferdinand Marcos Jr.", "", "")
+    assert resolve(index, "Bongbong Marcos", "Ilocos Norte") == ("Ferdinand Marcos Jr.", "", "")
+
+
+def test_typo_resolves(index):
+    assert resolve(index, "Rodrigo Dutrte") == ("Rodrigo Duterte", "", "")
+    assert resolve(index, "Manny Pacquaio") == ("Manny Pacquiao", "", "")
+
+
+@pytest.mark.parametrize("name", [
+    "Rigo Duterte",
+    "Paolo Duterte",
+    "Imelda Marcos",
+    "Imelda Romualdez Marcos",
+    "Sarah Duterte",
+])
+def test_relatives_of_seeds_stay_apart(index, name):
+    assert resolve(index, name) == (name, "", "")
+
+
+@pytest.mark.parametrize("known, asked", [
+    ("Juan Dela Cruz", "Juana Dela Cruz"),
+    ("Mario Santos", "Maria Santos"),
+    ("Jose Santos", "Josefa Santos"),
+])
+def test_learned_relatives_stay_apart(index, known, asked):
+    learn(index, known, "Bulacan", "Malolos")
+    assert resolve(index, asked, "Bulacan", "Malolos") == (asked, "Bulacan", "Malolos")
+
+
+def test_learned_alias_only_in_its_locality(index):
+    learn(index, "Juan Dela Cruz", "Bulacan", "Malolos")
+    assert resolve(index, "Juan Dela Crux", "Bulacan", "Malolos") == ("Juan Dela Cruz", "Bulacan", "Malolos")
+    assert resolve(index, "Juan Dela Crux", "Cebu", "Cebu City") == ("Juan Dela Crux", "Cebu", "Cebu City")
+
+
+def test_more_than_one_typo_per_word_is_another_name(index):
+    assert resolve(index, "Rodrigo Duterto Jr") == ("Rodrigo Duterto Jr", "", "")
+    assert resolve(index, "Rodrigo Dterto") == ("Rodrigo Dterto", "", "")
+
+
+def test_ambiguous_typo_is_unresolved(index):
+    learn(index, "Juan Santos", "Bulacan", "Malolos")
+    learn(index, "Juan Santon", "Bulacan", "Malolos")
+    assert resolve(index, "Juan Santoz", "Bulacan", "Malolos") == ("Juan Santoz", "Bulacan", "Malolos")
+
+
+@pytest.mark.parametrize("alias, suffix", [
+    ("ferdinandmarcosjr", "jr"),
+    ("ferdinandmarcossr", "sr"),
+    ("vicentesottoiii", "iii"),
+    ("ferdinandmarcos", ""),
+])
+def test_name_suffix(alias, suffix):
+    assert name_suffix(alias) == suffix
+
+
+def test_suffixes_stay_apart(index):
+    learn(index, "Ferdinand Marcos Sr.")
+    # One letter away from the Jr. seed
+    assert resolve(index, "Ferdinand Marcos Sr") == ("Ferdinand Marcos Sr.", "", "")
+    assert resolve(index, "Ferdinand Markos Sr") == ("Ferdinand Marcos Sr.", "", "")
+    assert resolve(index, "Ferdinand Markos Jr") == ("Ferdinand Marcos Jr.", "", "")
+    assert resolve(index, "Vicente Soto II") == ("Vicente Soto II", "", "")
+
+
+def test_learn_keeps_word_breaks(index, monkeypatch):
+    class Pipeline:
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: None
+
+        async def execute(self):
+            return [0] * 5
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    class Redis:
+        def pipeline(self, transaction=True):
+            return Pipeline()
+
+    monkeypatch.setattr(main, "get_redis", lambda: Redis())
+    names = {"commonName": "Juan Dela Cruz", "legalName": "Juan Santos Dela Cruz"}
+    asyncio.run(index.learn("Juanito Dela Cruz", "Bulacan", "Malolos", names))
+    scope = locality_scope("Bulacan", "Malolos")
+    assert (scope, "juanito dela cruz") in index.grams[" ju"]
+    assert resolve(index, "Juanito Dela Crus", "Bulacan", "Malolos") == ("Juan Dela Cruz", "Bulacan", "Malolos")
+
+
+def test_edit_distance_stops_at_limit():
+    assert edit_distance("duterte", "dutrte", 1) == 1
+    assert edit_distance("rigo", "rodrigo", 2) == 3
+    assert edit_distance("imee", "imelda", 1) == 2
+
+
+def test_name_spelling():
+    assert name_spelling("  Ferdinand R. Marcos Jr. ") == "ferdinand r marcos jr"
+    assert name_spelling("Sara Duterte-Carpio").replace(" ", "") == main.normalize_name("Sara Duterte-Carpio")
+
+
+def test_swapped_letters_are_one_typo():
+    assert edit_distance("pacquiao", "pacquaio", 1) == 1
+    assert edit_distance("pacquiao", "pacqiuao", 1) == 1
+
+
+def test_exact_only_resolution(index):
+    assert asyncio.run(index.resolve("Rodrigo Dutrte", fuzzy=False)) == ("Rodrigo Dutrte", "", "")
+    assert asyncio.run(index.resolve("Digong", fuzzy=False)) == ("Rodrigo Duterte", "", "")
@@ -0,0 +1,164 @@
+import asyncio
+import binascii
+
+import pytest
+
+import main
+from main import AdaptiveTokenBucket, CircuitBreaker, UpstreamError, UpstreamGovernor
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(main.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.retry_after() == 30
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 31
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.retry_after() == 30
+
+
+def test_throttle_halves_rate_down_to_min(clock):
+    bucket = AdaptiveTokenBucket(rate=8, capacity=4, min_rate=1, max_rate=10, increase=0.5)
+    bucket.on_throttle()
+    assert bucket.rate == 4
+    # Further 429s within a second are the same burst
+    bucket.on_throttle()
+    assert bucket.rate == 4
+    for _ in range(5):
+        clock.now += 1
+        bucket.on_throttle()
+    assert bucket.rate == 1
+
+
+def test_success_adds_back_up_to_max(clock):
+    bucket = AdaptiveTokenBucket(rate=9, capacity=4, min_rate=1, max_rate=10, increase=0.5)
+    bucket.on_success()
+    assert bucket.rate == 9.5
+    for _ in range(5):
+        bucket.on_success()
+    assert bucket.rate == 10
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = AdaptiveTokenBucket(rate=2, capacity=4, min_rate=1, max_rate=10, increase=0.5)
+    bucket.tokens = 0
+    clock.now += 1
+    bucket.refill()
+    assert bucket.tokens == 2
+    clock.now += 10
+    bucket.refill()
+    assert bucket.tokens == 4
+
+
+def governed(monkeypatch, error: Exception) -> tuple[UpstreamGovernor, list]:
+    governor = UpstreamGovernor("translate", rate=100, burst=100, min_rate=1, max_rate=100)
+    monkeypatch.setattr(main, "translate_governor", governor)
+    monkeypatch.setattr(main, "UPSTREAM_BACKOFF_BASE", 0)
+    calls = []
+
+    def translate_sync(batch, target_language):
+        calls.append(batch)
+        raise error
+
+    monkeypatch.setattr(main, "translate_sync", translate_sync)
+    return governor, calls
+
+
+@pytest.mark.parametrize("error", [
+    binascii.Error("Incorrect padding"),
+    ValueError("Could not deserialize key data"),
+])
+def test_translate_configuration_error_is_not_retried(monkeypatch, error):
+    governor, calls = governed(monkeypatch, error)
+    with pytest.raises(type(error)):
+        asyncio.run(main.translate_batch(["hi"], "tl"))
+    assert len(calls) == 1
+    assert governor.breaker.failures == 0
+
+
+def test_translate_credentials_error_is_not_retried(monkeypatch):
+    from google.auth.exceptions import DefaultCredentialsError
+
+    governor, calls = governed(monkeypatch, DefaultCredentialsError("no credentials"))
+    with pytest.raises(DefaultCredentialsError):
+        asyncio.run(main.translate_batch(["hi"], "tl"))
+    assert len(calls) == 1 and governor.breaker.failures == 0
+
+
+def test_translate_transport_error_is_retried(monkeypatch):
+    import requests
+
+    governor, calls = governed(monkeypatch, requests.ConnectionError("reset"))
+    with pytest.raises(UpstreamError) as raised:
+        asyncio.run(main.translate_batch(["hi"], "tl"))
+    assert raised.value.retryable
+    assert len(calls) == main.UPSTREAM_MAX_RETRIES + 1
+    assert governor.breaker.failures == len(calls)
+
+
+@pytest.mark.parametrize("code, retried", [(429, True), (503, True), (400, False), (403, False)])
+def test_translate_http_errors(monkeypatch, code, retried):
+    from google.api_core.exceptions import from_http_status
+
+    governor, calls = governed(monkeypatch, from_http_status(code, "error"))
+    with pytest.raises(UpstreamError) as raised:
+        asyncio.run(main.translate_batch(["hi"], "tl"))
+    assert raised.value.status_code == code
+    assert (len(calls) > 1) == retried
+
+
+def test_configuration_error_does_not_leave_probe_pending(monkeypatch, clock):
+    governor, _ = governed(monkeypatch, ValueError("bad key"))
+    governor.breaker.failures = main.BREAKER_FAILURE_THRESHOLD
+    governor.breaker.opened_at = clock.now - main.BREAKER_RESET_TIMEOUT
+    with pytest.raises(ValueError):
+        asyncio.run(main.translate_batch(["hi"], "tl"))
+    # The next call may probe again
+    assert governor.breaker.allow()
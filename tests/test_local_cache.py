@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import main
+from main import CACHE_INVALIDATION_CHANNEL, LocalCache
+
+
+async def wait_for(condition, timeout: float = 2):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def run(scenario, monkeypatch):
+    async def main_task():
+        local = LocalCache(1024 * 1024, 30)
+        monkeypatch.setattr(main, "local_cache", local)
+        # Bypassed until subscribed, since invalidations could be missed
+        assert local.get("k") is None
+        await wait_for(lambda: local.subscribed)
+        try:
+            return await scenario(local)
+        finally:
+            await local.close()
+    return asyncio.run(main_task())
+
+
+def test_invalidation_drops_entry(redis, monkeypatch):
+    async def scenario(local):
+        local.put("k", {"v": 1}, 10, local.generation)
+        assert local.get("k") == {"v": 1}
+        generation = local.generation
+        await main.get_redis().publish(CACHE_INVALIDATION_CHANNEL, json.dumps(["k"]))
+        await wait_for(lambda: local.generation > generation)
+        return local.get("k"), local.stats["invalidations"]
+
+    assert run(scenario, monkeypatch) == (None, 1)
+
+
+def test_invalidation_rejects_concurrent_stale_put(redis, monkeypatch):
+    async def scenario(local):
+        # A read takes its generation, then another worker writes the key before the read fills the tier
+        generation = local.generation
+        await main.get_redis().publish(CACHE_INVALIDATION_CHANNEL, json.dumps(["k"]))
+        await wait_for(lambda: local.generation > generation)
+        local.put("k", {"v": "old"}, 10, generation)
+        stale = local.get("k")
+        local.put("k", {"v": "new"}, 10, local.generation)
+        return stale, local.get("k")
+
+    assert run(scenario, monkeypatch) == (None, {"v": "new"})
+
+
+def test_write_by_another_worker_is_not_served_stale(redis, monkeypatch):
+    async def scenario(local):
+        await main.cache_set("section:desc:k", {"desc": "old"})
+        assert await main.cache_get("section:desc:k") == {"desc": "old"}
+        # Another worker's write reaches this one only over pub/sub
+        generation = local.generation
+        await main.get_redis().set("section:desc:k", main.encode_entry("section:desc:k", {"desc": "new"}))
+        await main.get_redis().publish(CACHE_INVALIDATION_CHANNEL, json.dumps(["section:desc:k"]))
+        await wait_for(lambda: local.generation > generation)
+        return await main.cache_get("section:desc:k")
+
+    assert run(scenario, monkeypatch) == {"desc": "new"}
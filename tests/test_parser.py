@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from main import IncrementalJSONParser, parse_completion
+
+
+def fenced(document: dict, before: str = "", after: str = "") -> str:
+    return f"{before}```json\n{json.dumps(document)}\n```{after}"
+
+
+def test_plain_document():
+    assert parse_completion('{"desc": "hi"}') == {"desc": "hi"}
+
+
+def test_fenced_document():
+    assert parse_completion(fenced({"cases": [{"title": "a"}]})) == {"cases": [{"title": "a"}]}
+
+
+def test_citations_before_fence():
+    content = 'Based on the sources [1][2], here is the JSON:\n```json\n{"desc": "hi"}\n```'
+    assert parse_completion(content) == {"desc": "hi"}
+
+
+def test_citations_after_document():
+    assert parse_completion(fenced({"desc": "hi"}, after=" [3]")) == {"desc": "hi"}
+
+
+def test_prose_placeholder_without_fence():
+    assert parse_completion('Note (see {sources}): {"desc": "hi"}') == {"desc": "hi"}
+
+
+def test_citation_without_fence_prefers_document():
+    assert parse_completion('Sources [1]: {"cases": [{"title": "a"}]}') == {"cases": [{"title": "a"}]}
+
+
+def test_inline_code_before_fence():
+    content = 'Use `cases` as the key.\n' + fenced({"cases": []})
+    assert parse_completion(content) == {"cases": []}
+
+
+def test_escaped_strings():
+    document = {"desc": 'He said "no" [1] {x} \\ ```', "cases": [{"title": 'a "quoted" ]}'}]}
+    assert parse_completion(fenced(document)) == document
+    assert parse_completion(json.dumps(document)) == document
+
+
+def test_unicode_escapes():
+    assert parse_completion('```json\n{"desc": "Pe\\u00f1a"}\n```') == {"desc": "Peña"}
+
+
+def test_truncated_keeps_closed_items():
+    parser = IncrementalJSONParser()
+    parser.feed('```json\n{"cases": [{"title": "a"}, {"title": "b"}, {"tit')
+    assert parser.result() == {"cases": [{"title": "a"}, {"title": "b"}]}
+    assert parser.partial
+
+
+def test_truncated_root_array():
+    parser = IncrementalJSONParser()
+    parser.feed('["Juan", "Maria", "Jo')
+    assert parser.result() == ["Juan", "Maria"]
+    assert parser.partial
+
+
+def test_malformed_tail_keeps_closed_items():
+    parser = IncrementalJSONParser()
+    parser.feed('{"cases": [{"title": "a"}}')
+    assert parser.result() == {"cases": [{"title": "a"}]}
+    assert parser.partial
+
+
+def test_complete_document_is_not_partial():
+    parser = IncrementalJSONParser()
+    parser.feed(fenced({"cases": [{"title": "a"}]}, before="See [1]. "))
+    assert parser.result() == {"cases": [{"title": "a"}]}
+    assert not parser.partial
+
+
+def test_nothing_to_parse():
+    with pytest.raises(ValueError):
+        parse_completion("No information found [1].")
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_streamed_in_chunks(size):
+    document = {"cases": [{"title": "a [1]"}, {"title": "b"}], "desc": "x"}
+    content = fenced(document, before="Per [1][2] `json` below:\n", after=" [4]")
+    parser = IncrementalJSONParser()
+    items = []
+    for start in range(0, len(content), size):
+        items.extend(parser.feed(content[start:start + size]))
+    assert parser.result() == document
+    assert items == [("cases", {"title": "a [1]"}), ("cases", {"title": "b"})]
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+import main
+
+
+def trending_entry(names: list[str], fresh_until: float) -> dict:
+    return {"response": {"status": "success", "data": {"trending": names}}, "fresh_until": fresh_until}
+
+
+def test_fresh_trending_list_is_not_refetched(redis, monkeypatch):
+    async def get_response(prompt, stream=None):
+        raise AssertionError("trending list refetched while fresh")
+
+    monkeypatch.setattr(main, "get_response", get_response)
+
+    async def run():
+        key = main.generate_section_key("trending", "top_10")
+        await main.cache_set(key, trending_entry(["Sara Duterte"], time.time() + 60), ttl=120)
+        return await main.refresh_trending()
+
+    assert asyncio.run(run()) == ["Sara Duterte"]
+
+
+def test_stale_trending_list_waits_for_headroom(redis, monkeypatch):
+    calls = []
+
+    async def wait_for_headroom():
+        calls.append("headroom")
+
+    async def get_response(prompt, stream=None):
+        calls.append("upstream")
+        return {"status": "success", "data": {"trending": ["Risa Hontiveros"]}}
+
+    monkeypatch.setattr(main, "wait_for_headroom", wait_for_headroom)
+    monkeypatch.setattr(main, "get_response", get_response)
+
+    async def run():
+        key = main.generate_section_key("trending", "top_10")
+        await main.cache_set(key, trending_entry(["Sara Duterte"], time.time() - 1), ttl=120)
+        return await main.refresh_trending()
+
+    assert asyncio.run(run()) == ["Risa Hontiveros"]
+    assert calls == ["headroom", "upstream"]
@@ -0,0 +1,14 @@
+import main
+
+
+def test_complete_section_entry():
+    entry, ttl = main.section_entry("cases", {"status": "success", "data": {"cases": []}}, 1000.0)
+    assert entry["fresh_until"] == 1000.0 + main.SECTION_TTLS["cases"]
+    assert ttl == main.SECTION_TTLS["cases"] + main.CACHE_STALE_TTL
+
+
+def test_partial_section_entry_is_stale_and_short_lived():
+    response = {"status": "success", "data": {"cases": [{"title": "a"}]}, "partial": True}
+    entry, ttl = main.section_entry("cases", response, 1000.0)
+    assert entry == {"response": response, "fresh_until": 1000.0}
+    assert ttl == main.PARTIAL_SECTION_TTL
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+import main
+from main import SingleFlight
+
+
+@pytest.fixture(autouse=True)
+def quick(monkeypatch):
+    # Long poll interval, so a waiter that returns promptly was woken over pub/sub
+    monkeypatch.setattr(main, "SINGLEFLIGHT_POLL_INTERVAL", 5)
+    monkeypatch.setattr(main, "SINGLEFLIGHT_WAIT_TIMEOUT", 10)
+
+
+class Store:
+    # Stands in for the cache the computation writes to and lookup() reads from
+    def __init__(self):
+        self.values = {}
+        self.computed = []
+
+    def compute(self, worker: str, key: str, value, delay: float = 0.1, fail: bool = False):
+        async def compute():
+            self.computed.append(worker)
+            await asyncio.sleep(delay)
+            if fail:
+                raise RuntimeError(f"{worker} failed")
+            self.values[key] = value
+            return value
+        return compute
+
+    def lookup(self, key: str):
+        async def lookup():
+            return self.values.get(key)
+        return lookup
+
+
+def run(scenario):
+    async def main_task():
+        workers = [SingleFlight(), SingleFlight()]
+        try:
+            return await scenario(*workers)
+        finally:
+            for worker in workers:
+                await worker.close()
+    return asyncio.run(main_task())
+
+
+def test_concurrent_callers_share_one_computation(redis):
+    store = Store()
+
+    async def scenario(worker, _):
+        results = await asyncio.gather(*(
+            worker.do("k", store.compute("a", "k", "value"), store.lookup("k")) for _ in range(5)
+        ))
+        return results, worker.stats
+
+    results, stats = run(scenario)
+    assert results == ["value"] * 5
+    assert store.computed == ["a"]
+    assert stats["leader"] == 1 and stats["coalesced_local"] == 4
+
+
+def test_other_worker_waits_for_the_leader(redis):
+    store = Store()
+
+    async def scenario(a, b):
+        leader = asyncio.create_task(a.do("k", store.compute("a", "k", "from a", delay=0.3), store.lookup("k")))
+        await asyncio.sleep(0.05)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await b.do("k", store.compute("b", "k", "from b"), store.lookup("k"))
+        return result, await leader, loop.time() - started, b.stats
+
+    result, leader_result, waited, stats = run(scenario)
+    assert result == leader_result == "from a"
+    assert store.computed == ["a"]
+    assert stats["coalesced_remote"] == 1 and stats["leader"] == 0
+    assert waited < 1
+
+
+def test_follower_takes_over_when_the_leader_fails(redis):
+    store = Store()
+
+    async def scenario(a, b):
+        leader = asyncio.create_task(a.do("k", store.compute("a", "k", "from a", delay=0.2, fail=True), store.lookup("k")))
+        await asyncio.sleep(0.05)
+        result = await b.do("k", store.compute("b", "k", "from b"), store.lookup("k"))
+        with pytest.raises(RuntimeError):
+            await leader
+        return result, b.stats
+
+    result, stats = run(scenario)
+    assert result == "from b"
+    assert store.computed == ["a", "b"]
+    assert stats["coalesced_remote"] == 1 and stats["leader"] == 1
+
+
+def test_follower_computes_itself_after_the_wait_timeout(redis, monkeypatch):
+    monkeypatch.setattr(main, "SINGLEFLIGHT_WAIT_TIMEOUT", 0.3)
+    store = Store()
+
+    async def scenario(a, b):
+        leader = asyncio.create_task(a.do("k", store.compute("a", "k", "from a", delay=1), store.lookup("k")))
+        await asyncio.sleep(0.05)
+        result = await b.do("k", store.compute("b", "k", "from b"), store.lookup("k"))
+        await leader
+        return result, b.stats
+
+    result, stats = run(scenario)
+    assert result == "from b"
+    assert stats["remote_timeout"] == 1
+
+
+def test_lock_is_released(redis):
+    store = Store()
+
+    async def scenario(a, _):
+        await a.do("k", store.compute("a", "k", "value"), store.lookup("k"))
+        return await main.get_redis().exists("singleflight:lock:k")
+
+    assert run(scenario) == 0